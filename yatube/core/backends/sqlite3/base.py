@@ -0,0 +1,15 @@
+"""SQLite с немедленной блокировкой на запись в транзакциях.
+
+Обычный ``BEGIN`` откладывает блокировку до первой записи. Если к этому
+моменту другой процесс уже что-то записал, SQLite сразу отвечает
+``database is locked``, не дожидаясь busy_timeout. ``BEGIN IMMEDIATE``
+берёт блокировку в начале транзакции, и конкурирующие писатели просто
+ждут своей очереди.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {settings.SQLITE_BEGIN}'.strip())
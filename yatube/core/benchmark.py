@@ -0,0 +1,70 @@
+"""Общие помощники для замеров производительности."""
+import math
+import os
+import time
+from contextlib import contextmanager
+from threading import local
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+
+def percentile(values, p):
+    """Перцентиль ``p`` (0–100) по методу ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """Сводка по замерам в секундах: число, среднее и перцентили в мс."""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p90_ms': round(percentile(values, 90) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(max(values) * 1000, 3),
+    }
+
+
+@contextmanager
+def timer(samples):
+    """Добавляет в ``samples`` длительность блока в секундах."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+def use_database(name):
+    """Переключает основную БД на файл ``name`` (для отдельной копии)."""
+    connections.close_all()
+    connections['default'].settings_dict['NAME'] = name
+
+
+def scratch_cache(directory):
+    """Настройка отдельного SQLiteCache в каталоге ``directory``."""
+    return {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+    }
+
+
+def use_cache(config):
+    """Переключает кеш по умолчанию на ``config``, возвращает прежний.
+
+    Замеры сбрасывают кеш и наполняют его синтетическими страницами;
+    с общим кешем живых воркеров это увидели бы пользователи.
+    """
+    previous = settings.CACHES['default']
+    settings.CACHES = dict(settings.CACHES, default=config)
+    # Экземпляры бэкендов создаются заново по новой настройке.
+    caches._caches = local()
+    return previous
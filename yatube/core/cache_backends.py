@@ -0,0 +1,287 @@
+"""Кеш в файле SQLite, общий для всех процессов на одном хосте.
+
+В отличие от LocMemCache, каждый воркер gunicorn видит одни и те же
+записи, поэтому доля попаданий не падает с ростом числа воркеров,
+а сброс версий в posts.caching доходит до всех процессов сразу.
+Файл открывается в режиме WAL и отображается в память (mmap), так что
+чтения идут параллельно и почти не касаются диска.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_totals ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' entries INTEGER NOT NULL,'
+    ' bytes INTEGER NOT NULL'
+    ')',
+    'INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0)',
+    # Итоги поддерживаются триггерами, чтобы не считать COUNT(*) на set().
+    'CREATE TRIGGER IF NOT EXISTS cache_ins AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_totals SET entries = entries + 1,'
+    ' bytes = bytes + NEW.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_del AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_totals SET entries = entries - 1,'
+    ' bytes = bytes - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_upd AFTER UPDATE OF size ON cache'
+    ' BEGIN UPDATE cache_totals SET bytes = bytes - OLD.size + NEW.size;'
+    ' END',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Общий для процессов кеш с вытеснением давно не читанных записей.
+
+    OPTIONS: ``MAX_ENTRIES`` и ``CULL_FREQUENCY`` как у встроенных
+    бэкендов, ``MAX_SIZE`` — предел суммарного размера значений в байтах,
+    ``MMAP_SIZE`` и ``BUSY_TIMEOUT`` — настройки соединения SQLite.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # Время последнего чтения обновляется не чаще раза в секунду,
+    # чтобы чтения не превращались в записи.
+    touch_resolution = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._mmap_size = int(options.get('MMAP_SIZE', 256 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        # После fork соединение родителя использовать нельзя.
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _store(self, connection, key, value, timeout, now):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed, size)'
+            ' VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+            ' expires = excluded.expires, accessed = excluded.accessed,'
+            ' size = excluded.size',
+            (key, pickled, self._expiry(timeout), now, len(pickled)),
+        )
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        excess = max(entries - self._max_entries, 0)
+        count = max(excess, entries // self._cull_frequency, 1)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count,),
+        )
+        # Если не хватило — вытесняем по одной порции, пока не влезем.
+        while True:
+            entries, size = connection.execute(
+                'SELECT entries, bytes FROM cache_totals'
+            ).fetchone()
+            if not entries or size <= self._max_size:
+                break
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(entries // self._cull_frequency, 1),),
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            self._store(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        connection = self._connection()
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        rows = connection.execute(
+            'SELECT key, value, expires, accessed FROM cache'
+            f' WHERE key IN ({placeholders})',
+            keys,
+        ).fetchall()
+        found, stale, expired = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append(key)
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self.touch_resolution:
+                stale.append(key)
+        if stale or expired:
+            with self._write() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    [(now, key) for key in stale],
+                )
+                connection.executemany(
+                    'DELETE FROM cache WHERE key = ?'
+                    ' AND expires IS NOT NULL AND expires <= ?',
+                    [(key, now) for key in expired],
+                )
+        return found
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(mapping))
+        return {mapping[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            self._store(connection, key, value, timeout, now)
+            self._cull(connection, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as connection:
+            for key, value in data.items():
+                self._store(
+                    connection, self._key(key, version), value, timeout, now
+                )
+            self._cull(connection, now)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (self._expiry(timeout), now, key, now),
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            pickled = pickle.dumps(new_value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ?'
+                ' WHERE key = ?',
+                (pickled, len(pickled), now, key),
+            )
+        return new_value
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        with self._write() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок процесса: открывать его на каждый
+        # запрос дороже, чем держать.
+        pass
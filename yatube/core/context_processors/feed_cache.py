@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def feed_cache(request):
+    """Добавляет в контекст время жизни фрагментного кеша лент."""
+    return {'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT, }
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts import follows as follow_sets
+
+
+def follows(request):
+    """Добавляет множество авторов, на которых подписан пользователь.
+
+    Загружается только если шаблон к нему обратился.
+    """
+    return {
+        'followed_authors': SimpleLazyObject(
+            lambda: follow_sets.for_request(request)
+        ),
+    }
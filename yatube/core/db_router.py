@@ -0,0 +1,85 @@
+"""Маршрутизация запросов к БД: чтение с реплик, запись в основную.
+
+Реплики из DATABASE_REPLICAS используются только внутри HTTP-запроса
+(их выбирает ReplicaMiddleware), поэтому команды, миграции и фоновые
+потоки всегда работают с основной БД. После записи пользователь на
+REPLICA_PIN_SECONDS закрепляется за основной БД и видит свои изменения,
+даже если реплика ещё отстаёт.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_local = threading.local()
+
+
+class RequestState:
+    def __init__(self, replica, pinned):
+        self.replica = replica
+        self.pinned = pinned
+        # Запрос записывал данные: закрепить пользователя за основной БД.
+        self.sticky = False
+
+
+def start(pinned=False):
+    replicas = settings.DATABASE_REPLICAS
+    replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+    _local.state = RequestState(replica, pinned)
+    return _local.state
+
+
+def finish():
+    state = current()
+    _local.state = None
+    return state
+
+
+def current():
+    return getattr(_local, 'state', None)
+
+
+def pin():
+    """До конца запроса читать из основной БД и закрепить пользователя."""
+    state = current()
+    if state is not None:
+        state.pinned = True
+        state.sticky = True
+
+
+def use_primary(view):
+    """Декоратор для view, которые пишут в БД."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pin()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    # Сессии и пользователи читаются только из основной БД: отставшая
+    # реплика не должна разлогинивать пользователя сразу после входа.
+    primary_apps = {'sessions', 'auth'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.primary_apps:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = current()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
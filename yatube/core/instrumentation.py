@@ -0,0 +1,169 @@
+"""Замеры стоимости запросов: SQL, шаблоны и кеш по каждому view.
+
+Замеры текущего запроса хранятся в ``threading.local``; сводка по
+последним REQUEST_REPORT_SIZE запросам каждого view живёт в памяти
+процесса, поэтому при нескольких воркерах каждый показывает свою.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+from .benchmark import percentile, summarize
+
+_local = threading.local()
+_reports = defaultdict(deque)
+_reports_lock = threading.Lock()
+_MISSING = object()
+
+
+class RequestStats:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_time = 0
+        self.queries = 0
+        self.db_time = 0
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Вложенные вызовы кеша (get_many через get) не считаем дважды.
+        self.cache_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для ``connection.execute_wrapper``."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    stats = current()
+    _local.stats = None
+    if stats is not None:
+        stats.finish()
+    return stats
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def instrument_cache(cache):
+    """Подменяет get/get_many экземпляра кеша на считающие попадания.
+
+    Экземпляры кеша у каждого потока свои, поэтому хватает одной
+    подмены на экземпляр; без активного замера обёртки ничего не делают.
+    """
+    if getattr(cache, '_instrumented', False):
+        return
+    get, get_many = cache.get, cache.get_many
+
+    def instrumented_get(key, default=None, version=None):
+        stats = current()
+        value = get(key, _MISSING, version=version)
+        if stats is not None and not stats.cache_depth:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def instrumented_get_many(keys, version=None):
+        stats = current()
+        if stats is None:
+            return get_many(keys, version=version)
+        keys = list(keys)
+        stats.cache_depth += 1
+        try:
+            values = get_many(keys, version=version)
+        finally:
+            stats.cache_depth -= 1
+        if not stats.cache_depth:
+            stats.cache_hits += len(values)
+            stats.cache_misses += len(keys) - len(values)
+        return values
+
+    cache.get = instrumented_get
+    cache.get_many = instrumented_get_many
+    cache._instrumented = True
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время отрисовки."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def record(view_name, stats):
+    with _reports_lock:
+        samples = _reports[view_name]
+        if samples.maxlen != settings.REQUEST_REPORT_SIZE:
+            samples = _reports[view_name] = deque(
+                samples, maxlen=settings.REQUEST_REPORT_SIZE
+            )
+        samples.append(stats)
+
+
+def reset():
+    with _reports_lock:
+        _reports.clear()
+
+
+def report():
+    """Сводка по view: перцентили числа запросов, времени и доля попаданий."""
+    with _reports_lock:
+        snapshot = {name: list(samples) for name, samples in _reports.items()}
+    result = {}
+    for view_name, samples in sorted(snapshot.items()):
+        queries = [stats.queries for stats in samples]
+        hits = sum(stats.cache_hits for stats in samples)
+        lookups = hits + sum(stats.cache_misses for stats in samples)
+        result[view_name] = {
+            'requests': len(samples),
+            'budget': settings.QUERY_BUDGETS.get(view_name),
+            'queries': {
+                'p50': percentile(queries, 50),
+                'p90': percentile(queries, 90),
+                'p99': percentile(queries, 99),
+                'max': max(queries),
+            },
+            'total': summarize([stats.total_time for stats in samples]),
+            'db': summarize([stats.db_time for stats in samples]),
+            'templates': summarize(
+                [stats.template_time for stats in samples]
+            ),
+            'cache_hit_rate': round(hits / lookups, 4) if lookups else None,
+        }
+    return result
@@ -0,0 +1,84 @@
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.benchmark import summarize, timer
+from core.cache_backends import SQLiteCache
+
+
+def make_backend(name, location):
+    params = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': 100000}}
+    if name == 'locmem':
+        return LocMemCache('cache-benchmark', params)
+    return SQLiteCache(location, params)
+
+
+def run_worker(args):
+    """Один воркер: запросы по закону Ципфа, при промахе — запись."""
+    name, location, ops, keys, value_size, seed = args
+    cache = make_backend(name, location)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    payload = os.urandom(value_size)
+    hits = 0
+    samples = []
+    for key in rng.choices(range(keys), weights=weights, k=ops):
+        with timer(samples):
+            if cache.get(f'page:{key}') is None:
+                cache.set(f'page:{key}', payload)
+            else:
+                hits += 1
+    return hits, samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий и задержку LocMemCache и SQLiteCache '
+        'при нескольких процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--ops', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--value-size', type=int, default=2048)
+        parser.add_argument(
+            '--backends', nargs='+', default=['locmem', 'sqlite'],
+            choices=['locmem', 'sqlite'],
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {}
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['backends']:
+                location = os.path.join(directory, f'{name}.sqlite3')
+                jobs = [
+                    (name, location, options['ops'], options['keys'],
+                     options['value_size'], seed)
+                    for seed in range(options['workers'])
+                ]
+                with context.Pool(options['workers']) as pool:
+                    outcome = pool.map(run_worker, jobs)
+                hits = sum(worker_hits for worker_hits, _ in outcome)
+                samples = [s for _, worker in outcome for s in worker]
+                results[name] = {
+                    'workers': options['workers'],
+                    'hit_rate': round(hits / len(samples), 4),
+                    'latency': summarize(samples),
+                }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            latency = result['latency']
+            self.stdout.write(
+                f"{name:>7}: hit rate {result['hit_rate']:.1%}, "
+                f"p50 {latency['p50_ms']} ms, p99 {latency['p99_ms']} ms"
+            )
@@ -0,0 +1,170 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmark import (scratch_cache, summarize, timer, use_cache,
+                            use_database)
+from posts.models import Post
+
+User = get_user_model()
+
+# «До» — настройки SQLite по умолчанию, «после» — SQLITE_PRAGMAS и
+# BEGIN IMMEDIATE из settings.
+PROFILES = {
+    'stock': {'SQLITE_PRAGMAS': {}, 'SQLITE_BEGIN': ''},
+    'tuned': {
+        'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+        'SQLITE_BEGIN': settings.SQLITE_BEGIN,
+    },
+}
+
+
+def apply_profile(profile):
+    for name, value in PROFILES[profile].items():
+        setattr(settings, name, value)
+
+
+def run_worker(args):
+    """Один процесс: вперемешку главная страница и новые комментарии."""
+    profile, ops, write_ratio, seed, user_id, post_ids = args
+    apply_profile(profile)
+    # Без панели отладки и журнала SQL; ошибки блокировки считаем сами.
+    settings.DEBUG = False
+    logging.getLogger('django.request').disabled = True
+    # Соединения родителя нельзя делить с дочерними процессами.
+    connections.close_all()
+    client = Client()
+    client.force_login(User.objects.get(pk=user_id))
+    rng = random.Random(seed)
+    samples = []
+    locked = 0
+    for number in range(ops):
+        try:
+            with timer(samples):
+                if rng.random() < write_ratio:
+                    client.post(
+                        reverse('posts:add_comment', kwargs={
+                            'post_id': rng.choice(post_ids),
+                        }),
+                        {'text': f'Комментарий {seed}-{number}'},
+                    )
+                else:
+                    client.get(reverse('posts:index'))
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            locked += 1
+    connections.close_all()
+    return samples, locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает add_comment и index из нескольких процессов на копии '
+        'базы SQLite и сравнивает пропускную способность и ошибки '
+        'блокировки без настроек и с SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=100)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.5,
+            help='Доля запросов add_comment.',
+        )
+        parser.add_argument(
+            '--profiles', nargs='+', default=list(PROFILES),
+            choices=list(PROFILES),
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        original = {
+            'NAME': connections['default'].settings_dict['NAME'],
+            'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+            'SQLITE_BEGIN': settings.SQLITE_BEGIN,
+            'DATABASE_REPLICAS': settings.DATABASE_REPLICAS,
+        }
+        settings.DATABASE_REPLICAS = []
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                cache_config = use_cache(scratch_cache(directory))
+                try:
+                    results = self.run(directory, options)
+                finally:
+                    use_cache(cache_config)
+        finally:
+            use_database(original.pop('NAME'))
+            for name, value in original.items():
+                setattr(settings, name, value)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for profile, result in results.items():
+            latency = result['latency']
+            self.stdout.write(
+                f"{profile:>6}: {result['throughput_rps']} req/s, "
+                f"ошибок блокировки {result['lock_errors']}, "
+                f"p50 {latency.get('p50_ms')} ms, "
+                f"p99 {latency.get('p99_ms')} ms"
+            )
+
+    def prepare(self, path, posts):
+        """Создаёт шаблонную базу: схема, автор и посты."""
+        use_database(path)
+        apply_profile('stock')
+        call_command('migrate', verbosity=0, interactive=False)
+        user = User.objects.create_user(username='benchmark')
+        Post.objects.bulk_create(
+            Post(author=user, text=f'Пост {number}')
+            for number in range(posts)
+        )
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        connections.close_all()
+        return user.pk, post_ids
+
+    def run(self, directory, options):
+        template = os.path.join(directory, 'template.sqlite3')
+        user_id, post_ids = self.prepare(template, options['posts'])
+        context = multiprocessing.get_context('fork')
+        results = {}
+        for profile in options['profiles']:
+            path = os.path.join(directory, f'{profile}.sqlite3')
+            shutil.copy(template, path)
+            use_database(path)
+            # Каждый профиль начинает с пустого кеша.
+            cache.clear()
+            jobs = [
+                (profile, options['ops'], options['write_ratio'], seed,
+                 user_id, post_ids)
+                for seed in range(options['workers'])
+            ]
+            started = time.perf_counter()
+            with context.Pool(options['workers']) as pool:
+                outcome = pool.map(run_worker, jobs)
+            elapsed = time.perf_counter() - started
+            samples = [s for worker, _ in outcome for s in worker]
+            results[profile] = {
+                'workers': options['workers'],
+                'requests': len(samples),
+                'lock_errors': sum(locked for _, locked in outcome),
+                'throughput_rps': round(len(samples) / elapsed, 1),
+                'latency': summarize(samples),
+            }
+        return results
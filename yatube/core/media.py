@@ -0,0 +1,152 @@
+"""Раздача загруженных файлов из MEDIA_ROOT.
+
+Тело файла Python не читает: ``FileResponse`` отдаёт WSGI-серверу сам
+файл, и сервер с ``wsgi.file_wrapper`` (gunicorn, uWSGI) пишет его в
+сокет через ``os.sendfile``. При MEDIA_SENDFILE отдачу целиком берёт на
+себя фронтенд: nginx по X-Accel-Redirect или Apache/lighttpd по
+X-Sendfile, а приложение только проверяет путь и кеш.
+
+Поддерживаются один диапазон ``Range: bytes=...`` (несколько диапазонов
+отдаются целым файлом, это разрешено RFC 7233), ``If-Range`` и
+условные запросы по ETag из размера и времени изменения файла.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, который читается только в пределах диапазона.
+
+    ``fileno`` и текущая позиция остаются у файла, поэтому sendfile
+    сервера начинает с начала диапазона, а длину берёт из
+    Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """``(start, end)`` включительно, None — отдать файл целиком.
+
+    ValueError — диапазон вне файла (ответ 416).
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def sendfile_response(name, path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_PREFIX + name
+        )
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Файл ``MEDIA_ROOT/path`` с кешированием и диапазонами."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    etag = file_etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = build_response(request, path, full_path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(
+        response, public=True, max_age=settings.MEDIA_MAX_AGE
+    )
+    return response
+
+
+def build_response(request, name, path, stat, etag):
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding or content_type is None:
+        content_type = 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        # Диапазоны и отправку тела обрабатывает фронтенд.
+        return sendfile_response(name, path, content_type)
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and if_range in (None, etag):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+        return response
+    start, end = byte_range
+    response = FileResponse(
+        RangeFile(file, start, end - start + 1),
+        status=206, content_type=content_type,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,90 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from . import db_router, instrumentation
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class QueryBudgetExceeded(Exception):
+    """View сделал больше запросов к БД, чем разрешает QUERY_BUDGETS."""
+
+
+class QueryBudgetMiddleware:
+    """Замеряет запросы к БД, время БД и шаблонов и обращения к кешу.
+
+    Замеры копятся по ``resolver_match.view_name`` и доступны в отчёте
+    ``query_report``. Превышение бюджета из QUERY_BUDGETS пишется
+    в лог или, при QUERY_BUDGET_ACTION = 'raise', приводит к ошибке.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            instrumentation.instrument_cache(caches[alias])
+        stats = instrumentation.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        match = request.resolver_match
+        if match is not None:
+            instrumentation.record(match.view_name, stats)
+            self.check_budget(match.view_name, stats)
+        return response
+
+    def check_budget(self, view_name, stats):
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or stats.queries <= budget:
+            return
+        message = (
+            f'{view_name} made {stats.queries} queries, budget is {budget}'
+        )
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaMiddleware:
+    """Выбирает реплику для чтения и закрепляет писавших за основной БД.
+
+    Запросы, меняющие данные (не GET/HEAD) или помеченные
+    ``db_router.use_primary``, читают из основной БД и ставят cookie
+    REPLICA_PIN_COOKIE на REPLICA_PIN_SECONDS; пока она есть, чтение
+    тоже идёт в основную БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+        state = db_router.start(
+            pinned=writes or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.finish()
+        if writes or state.sticky:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
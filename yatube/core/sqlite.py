@@ -0,0 +1,35 @@
+"""Настройка соединений SQLite при их открытии.
+
+Параметры берутся из SQLITE_PRAGMAS: режим журнала, синхронизация,
+mmap, размер кеша страниц, ожидание блокировки и временные таблицы.
+"""
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# PRAGMA, которые принимают ключевое слово, а не число.
+KEYWORD_PRAGMAS = {'journal_mode', 'synchronous', 'temp_store'}
+KEYWORD = re.compile(r'^[A-Za-z]+$')
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if name in KEYWORD_PRAGMAS:
+            if not KEYWORD.match(str(value)):
+                raise ValueError(f'Bad value for PRAGMA {name}: {value!r}')
+        else:
+            value = int(value)
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
@@ -0,0 +1,183 @@
+"""Статика без внешнего веб-сервера.
+
+``CompressedManifestStaticFilesStorage`` при collectstatic пишет файлы
+с хешем содержимого в имени и рядом сжатые копии: ``.gz`` всегда,
+``.br`` — если установлен пакет brotli. ``StaticFilesApplication``
+оборачивает WSGI-приложение: при старте один раз обходит STATIC_ROOT,
+а дальше отдаёт файлы сам, выбирая сжатую копию по Accept-Encoding.
+Файлы с хешем в имени никогда не меняются, поэтому кешируются
+навсегда (``immutable``); остальные — на STATIC_MAX_AGE.
+"""
+import gzip
+import mimetypes
+import os
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.files.base import ContentFile
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+}
+# Сжатая копия сохраняется, только если она заметно меньше оригинала.
+MIN_RATIO = 0.95
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+def compressors():
+    result = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        result['.br'] = brotli.compress
+    return result
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, compress in compressors().items():
+            content = compress(data)
+            if len(content) > len(data) * MIN_RATIO:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(content))
+            yield target
+
+
+class Asset:
+    """Файл статики и его сжатые копии: кодировка -> (путь, размер)."""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        if self.content_type.startswith('text/'):
+            self.content_type += '; charset=utf-8'
+        self.last_modified = http_date(stat.st_mtime)
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.cache_control = IMMUTABLE if immutable else (
+            f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        self.variants = {None: (path, stat.st_size)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                size = os.path.getsize(path + suffix)
+                self.variants[encoding] = (path + suffix, size)
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых ``q=0``."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = params.strip().replace(' ', '')
+        if quality in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def manifest_names():
+    """Имена с хешем из манифеста collectstatic."""
+    load_manifest = getattr(staticfiles_storage, 'load_manifest', None)
+    if load_manifest is None:
+        return set()
+    return set(load_manifest().values())
+
+
+def scan(root):
+    """URL-путь относительно STATIC_URL -> Asset для всех файлов root."""
+    immutable = manifest_names()
+    assets = {}
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            if filename.endswith(suffixes) and os.path.exists(
+                os.path.splitext(path)[0]
+            ):
+                continue
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            assets[name] = Asset(path, name in immutable)
+    return assets
+
+
+class StaticFilesApplication:
+    """WSGI-обёртка, которая отдаёт STATIC_URL из STATIC_ROOT.
+
+    Неизвестные пути уходят в приложение, так что 404 рисует Django.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.prefix = prefix or settings.STATIC_URL
+        self.assets = scan(root or settings.STATIC_ROOT)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        asset = None
+        if path.startswith(self.prefix):
+            asset = self.assets.get(path[len(self.prefix):])
+        if asset is None:
+            return self.application(environ, start_response)
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+            return []
+        encoding = asset.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        filename, size = asset.variants[encoding]
+        etag = asset.etag if encoding is None else (
+            f'{asset.etag[:-1]}-{encoding}"'
+        )
+        headers = [
+            ('Cache-Control', asset.cache_control),
+            ('ETag', etag),
+            ('Last-Modified', asset.last_modified),
+        ]
+        if len(asset.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+        headers += [
+            ('Content-Type', asset.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(filename, 'rb'), CHUNK_SIZE)
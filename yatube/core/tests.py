@@ -1 +1,460 @@
-# Create your tests here.
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Engine
+from django.template.backends.django import get_installed_libraries
+from django.templatetags.static import static
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from . import db_router, instrumentation, sqlite, warmup
+from .staticfiles import StaticFilesApplication
+from .benchmark import percentile, scratch_cache, use_cache
+from .cache_backends import SQLiteCache
+from .middleware import QueryBudgetExceeded, ReplicaMiddleware
+
+User = get_user_model()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'answer': 42})
+        self.assertEqual(self.cache.get('key'), {'answer': 42})
+        self.assertEqual(
+            self.cache.get_many(['key', 'missing']), {'key': {'answer': 42}}
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_between_instances(self):
+        """Второй экземпляр (другой процесс) видит те же записи."""
+        self.cache.set('version', 1, None)
+        other = self.make_cache()
+        other.incr('version')
+        self.assertEqual(self.cache.get('version'), 2)
+        self.assertFalse(other.add('version', 10))
+
+    def test_expired_values_are_missing(self):
+        """Просроченная запись не возвращается и освобождает место."""
+        self.cache.set('key', 'value', 1)
+        self.cache.set('key', 'value', 0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.touch_resolution = 0
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('d'), 'd')
+
+    def test_size_limit(self):
+        """Суммарный размер значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=4096)
+        for i in range(20):
+            cache.set(f'key{i}', b'x' * 1000)
+        stored = sum(cache.has_key(f'key{i}') for i in range(20))
+        self.assertLessEqual(stored, 4)
+        self.assertTrue(cache.has_key('key19'))
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        """Перцентили считаются по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertIsNone(percentile([], 50))
+
+    def test_scratch_cache_is_isolated(self):
+        """Замер сбрасывает и наполняет свой кеш, а не общий."""
+        cache.set('live', 1)
+        with tempfile.TemporaryDirectory() as directory:
+            previous = use_cache(scratch_cache(directory))
+            try:
+                self.assertIsNone(cache.get('live'))
+                cache.clear()
+                cache.set('synthetic', 2)
+            finally:
+                use_cache(previous)
+        self.assertEqual(cache.get('live'), 1)
+        self.assertIsNone(cache.get('synthetic'))
+        cache.delete('live')
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_report_per_view(self):
+        """Запросы, шаблоны и кеш учитываются по имени view."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        report = instrumentation.report()['posts:index']
+        self.assertEqual(report['requests'], 2)
+        self.assertGreater(report['queries']['max'], 0)
+        self.assertEqual(report['queries']['p50'], 0)
+        self.assertGreater(report['templates']['count'], 0)
+        self.assertGreater(report['cache_hit_rate'], 0)
+
+    def test_report_is_staff_only(self):
+        """Отчёт доступен только сотрудникам."""
+        url = reverse('query_report')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {'format': 'json'})
+        self.assertIn('posts:index', response.json())
+        self.assertContains(self.client.get(url), 'posts:index')
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 0}, QUERY_BUDGET_ACTION='raise'
+    )
+    def test_budget_raise(self):
+        """Превышение бюджета в режиме raise даёт ошибку."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_budget_log(self):
+        """По умолчанию превышение бюджета только пишется в лог."""
+        with self.assertLogs('core.middleware', 'WARNING'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = db_router.ReplicaRouter()
+
+    def serve(self, request, view=None):
+        """Прогоняет запрос через middleware и запоминает БД для чтения."""
+        def get_response(request):
+            if view is not None:
+                view(request)
+            self.read_db = self.router.db_for_read(Post)
+            self.session_db = self.router.db_for_read(Session)
+            self.user_db = self.router.db_for_read(User)
+            return HttpResponse()
+        return ReplicaMiddleware(get_response)(request)
+
+    def test_reads_go_to_replica_inside_request(self):
+        """В GET-запросе чтение идёт с реплики, вне запроса — из основной."""
+        response = self.serve(self.factory.get('/'))
+        self.assertEqual(self.read_db, 'replica1')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_sessions_and_auth_read_primary(self):
+        """Сессии и пользователи не читаются с отстающей реплики."""
+        self.serve(self.factory.get('/'))
+        self.assertEqual(self.read_db, 'replica1')
+        self.assertEqual(self.session_db, 'default')
+        self.assertEqual(self.user_db, 'default')
+
+    def test_write_pins_to_primary(self):
+        """После записи пользователь читает из основной БД."""
+        response = self.serve(self.factory.post('/'))
+        self.assertEqual(self.read_db, 'default')
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = cookie.value
+        self.serve(request)
+        self.assertEqual(self.read_db, 'default')
+
+    def test_use_primary_view(self):
+        """GET-view с записью помечается use_primary и тоже закрепляет."""
+        view = db_router.use_primary(lambda request: None)
+        response = self.serve(self.factory.get('/'), view)
+        self.assertEqual(self.read_db, 'default')
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_statements(self):
+        """Ключевые слова проверяются, остальные значения — числа."""
+        self.assertEqual(
+            sqlite.pragma_statements(
+                {'journal_mode': 'wal', 'busy_timeout': '5000'}
+            ),
+            ['PRAGMA journal_mode = wal', 'PRAGMA busy_timeout = 5000'],
+        )
+        with self.assertRaises(ValueError):
+            sqlite.pragma_statements({'synchronous': 'off; DROP TABLE x'})
+        with self.assertRaises(ValueError):
+            sqlite.pragma_statements({'cache_size': 'big'})
+
+    def test_applied_to_connection(self):
+        """Новое соединение получает значения из SQLITE_PRAGMAS."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Только для SQLite')
+        pragmas = settings.SQLITE_PRAGMAS
+        with connection.cursor() as cursor:
+            for name in ('busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                with self.subTest(name=name):
+                    self.assertEqual(cursor.fetchone()[0], pragmas[name])
+            cursor.execute('PRAGMA temp_store')
+            # 2 — MEMORY.
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def make_engine(self):
+        return Engine(
+            dirs=[settings.TEMPLATES_DIR],
+            loaders=[('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ])],
+            libraries=get_installed_libraries(),
+        )
+
+    def test_template_names(self):
+        """Находятся шаблоны проекта и приложений, без повторов."""
+        names = warmup.template_names(self.make_engine())
+        self.assertIn('posts/includes/post_card.html', names)
+        self.assertIn('admin/base.html', names)
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_warm_fills_cached_loader(self):
+        """После прогрева шаблоны берутся из кеша загрузчика."""
+        engine = self.make_engine()
+        timings = warmup.warm(engine, ['base.html', 'includes/header.html'])
+        self.assertEqual(set(timings), {'base.html', 'includes/header.html'})
+        for seconds in timings.values():
+            self.assertIsInstance(seconds, float)
+        loader = engine.template_loaders[0]
+        self.assertIn('base.html', loader.get_template_cache)
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.root,
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.application = StaticFilesApplication(cls.fallback)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def fallback(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def request(self, path, method='GET', **environ):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        environ.update(PATH_INFO=path, REQUEST_METHOD=method)
+        body = b''.join(self.application(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_hashed_names_are_immutable(self):
+        """Имя с хешем кешируется навсегда, без хеша — на время."""
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        status, headers, _ = self.request(url)
+        self.assertEqual(status, '200 OK')
+        self.assertIn('immutable', headers['Cache-Control'])
+        _, headers, _ = self.request('/static/css/bootstrap.min.css')
+        self.assertEqual(
+            headers['Cache-Control'],
+            f'public, max-age={settings.STATIC_MAX_AGE}',
+        )
+
+    def test_precompressed_variant(self):
+        """Сжатая копия отдаётся, только если клиент её принимает."""
+        url = static('css/bootstrap.min.css')
+        status, headers, body = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        with open(os.path.join(
+            self.root, 'css', 'bootstrap.min.css'
+        ), 'rb') as file:
+            self.assertEqual(gzip.decompress(body), file.read())
+        for accept in ('', 'gzip;q=0'):
+            with self.subTest(accept=accept):
+                _, headers, _ = self.request(
+                    url, HTTP_ACCEPT_ENCODING=accept
+                )
+                self.assertNotIn('Content-Encoding', headers)
+
+    def test_conditional_and_methods(self):
+        url = static('img/logo.png')
+        _, headers, _ = self.request(url)
+        status, _, body = self.request(
+            url, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        status, headers, body = self.request(url, method='HEAD')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'')
+        self.assertGreater(int(headers['Content-Length']), 0)
+        status, _, _ = self.request(url, method='POST')
+        self.assertEqual(status, '405 Method Not Allowed')
+
+    def test_unknown_path_goes_to_django(self):
+        _, _, body = self.request('/static/missing.css')
+        self.assertEqual(body, b'django')
+        _, _, body = self.request('/group/static/')
+        self.assertEqual(body, b'django')
+
+
+@override_settings(MEDIA_SENDFILE=None)
+class MediaServeTests(SimpleTestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(MEDIA_ROOT=cls.root)
+        cls.settings.enable()
+        os.makedirs(os.path.join(cls.root, 'posts'))
+        with open(os.path.join(cls.root, 'posts', 'photo.jpg'), 'wb') as file:
+            file.write(cls.CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, path='/media/posts/photo.jpg', **headers):
+        return self.client.get(path, **headers)
+
+    def test_full_file(self):
+        """Файл отдаётся потоком с ETag и кешированием."""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(int(response['Content-Length']), len(self.CONTENT))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=', response['Cache-Control'])
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        """Один диапазон — ответ 206 ровно с этими байтами."""
+        cases = {
+            'bytes=0-9': (0, 9),
+            'bytes=1000-': (1000, 1023),
+            'bytes=-24': (1000, 1023),
+            'bytes=1020-5000': (1020, 1023),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/1024'
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    self.CONTENT[start:end + 1],
+                )
+                self.assertEqual(
+                    int(response['Content-Length']), end - start + 1
+                )
+
+    def test_bad_ranges(self):
+        response = self.get(HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+        # Несколько диапазонов и устаревший If-Range — весь файл.
+        response = self.get(HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        response = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_outside_root(self):
+        for path in ('/media/posts/none.jpg', '/media/posts/',
+                     '/media/../settings.py'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        response = self.client.post('/media/posts/photo.jpg')
+        self.assertEqual(response.status_code, 405)
+
+    def test_sendfile_offload(self):
+        """При MEDIA_SENDFILE тело отдаёт фронтенд."""
+        with self.settings_for('x-accel-redirect'):
+            response = self.get()
+            self.assertEqual(
+                response['X-Accel-Redirect'],
+                '/protected-media/posts/photo.jpg',
+            )
+            self.assertEqual(response.content, b'')
+        with self.settings_for('x-sendfile'):
+            response = self.get()
+            self.assertEqual(
+                response['X-Sendfile'],
+                os.path.join(self.root, 'posts', 'photo.jpg'),
+            )
+
+    def settings_for(self, mode):
+        return override_settings(
+            MEDIA_SENDFILE=mode, MEDIA_ACCEL_PREFIX='/protected-media/'
+        )
@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception):
     return render(
@@ -27,3 +31,11 @@ def permisssion_denied_view(request, exception):
         {'path': request.path},
         status=HTTPStatus.FORBIDDEN
     )
+
+
+@staff_member_required
+def query_report(request):
+    report = instrumentation.report()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report)
+    return render(request, 'core/query_report.html', {'report': report})
@@ -0,0 +1,73 @@
+"""Прогрев шаблонов при старте воркера.
+
+В производственном режиме (TEMPLATE_CACHE) шаблоны хранит в памяти
+``django.template.loaders.cached.Loader``, но заполняется он только
+первыми запросами. ``warm`` заранее компилирует все шаблоны из DIRS и
+каталогов приложений, чтобы первые запросы воркера не платили за
+чтение и разбор.
+"""
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+
+
+def default_backend():
+    """Шаблонизатор проекта (первый в TEMPLATES)."""
+    return engines.all()[0]
+
+
+def template_dirs(engine):
+    """Каталоги шаблонов в порядке поиска, включая вложенные загрузчики."""
+    dirs = []
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                if directory not in dirs:
+                    dirs.append(str(directory))
+    return dirs
+
+
+def template_names(engine, dirs=None):
+    """Имена всех шаблонов; при совпадении побеждает первый каталог."""
+    names = []
+    seen = set()
+    for directory in dirs or template_dirs(engine):
+        for root, subdirs, files in os.walk(directory):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith('.'))
+            for filename in sorted(files):
+                if filename.startswith('.'):
+                    continue
+                name = os.path.relpath(
+                    os.path.join(root, filename), directory
+                ).replace(os.sep, '/')
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+    return names
+
+
+def reset(engine):
+    """Очищает кеш cached.Loader, если он включён."""
+    for loader in engine.template_loaders:
+        if hasattr(loader, 'reset'):
+            loader.reset()
+
+
+def warm(engine=None, names=None):
+    """Компилирует шаблоны и возвращает время компиляции каждого.
+
+    Вместо времени для шаблона, который не разобрался, возвращается
+    исключение: прогрев не должен ронять старт воркера.
+    """
+    engine = engine or default_backend().engine
+    timings = {}
+    for name in names or template_names(engine):
+        start = time.perf_counter()
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, UnicodeDecodeError) as error:
+            timings[name] = error
+        else:
+            timings[name] = time.perf_counter() - start
+    return timings
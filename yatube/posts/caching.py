@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .paginators import (CountedPaginator, CursorPage, CursorPaginator,
+                         page_count, paginate)
+
+GLOBAL_SCOPE = 'global'
+
+
+def _version_key(scope):
+    return f'posts:version:{scope}'
+
+
+def _initial_version():
+    # Версия растёт со временем: если ключ вытеснят из кеша, новая
+    # версия не совпадёт со старой и устаревшие записи не всплывут.
+    return int(time.time() * 1000)
+
+
+def get_version(*scopes):
+    """Текущая версия набора областей кеша одной строкой."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), settings.FEED_VERSION_TIMEOUT)
+            versions[key] = cache.get(key)
+    return '.'.join(f'{scope}-{versions[key]}'
+                    for scope, key in zip(scopes, keys))
+
+
+def bump(*scopes):
+    """Сдвигает версии областей, делая их записи в кеше недостижимыми.
+
+    Внутри транзакции версии сдвигаются после коммита: иначе запрос,
+    пришедший до коммита, закеширует под новой версией страницу без
+    этой записи.
+    """
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), settings.FEED_VERSION_TIMEOUT)
+
+
+def feed_scopes(scope):
+    return (GLOBAL_SCOPE, scope)
+
+
+def post_scopes(post, previous_group_id=None):
+    """Области кеша, которые показывают пост."""
+    scopes = {'index', f'author:{post.author_id}'}
+    for group_id in (post.group_id, previous_group_id):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+def _rebuild(queryset, data):
+    if 'number' in data:
+        paginator = CountedPaginator(queryset, page_count, data['count'])
+        return Page(data['objects'], data['number'], paginator)
+    paginator = CursorPaginator(queryset, page_count)
+    return CursorPage(
+        data['objects'],
+        paginator,
+        next_cursor=data['next'],
+        previous_cursor=data['previous'],
+    )
+
+
+def cached_page(request, scope, queryset, count=None, prepare=None):
+    """Страница ленты из кеша; в БД идём только при промахе.
+
+    Ключ содержит версию области ``scope``, поэтому любая запись,
+    сдвинувшая версию, сразу делает старые страницы недостижимыми.
+    ``prepare`` вызывается для объектов страницы перед сохранением
+    в кеш. Возвращает страницу и версию для ключей фрагментного кеша.
+    """
+    version = get_version(*feed_scopes(scope))
+    params = '|'.join(
+        request.GET.get(name, '-') for name in ('page', 'after', 'before')
+    )
+    key = f'posts:page:{version}:{params}'
+    data = cache.get(key)
+    if data is not None:
+        return _rebuild(queryset, data), version
+    # Страница попадёт в общий кеш под свежей версией, поэтому читаем
+    # её из основной БД: отстающая реплика закрепила бы старые данные.
+    page = paginate(request, queryset.using(DEFAULT_DB_ALIAS), count=count)
+    if prepare is not None:
+        prepare(page.object_list)
+    if isinstance(page, CursorPage):
+        data = {
+            'objects': list(page.object_list),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+    else:
+        data = {
+            'objects': list(page.object_list),
+            'number': page.number,
+            'count': page.paginator.count,
+        }
+    cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+    return page, version
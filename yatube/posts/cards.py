@@ -0,0 +1,81 @@
+"""Кеш отрисованных карточек постов.
+
+Карточка хранится под ключом из id поста и отпечатка всего, что она
+показывает: текста, даты, изображения и миниатюры, группы, имени
+автора. Любая правка поста, смена группы или картинки, переименование
+автора дают новый ключ, поэтому сбрасывать кеш сигналами не нужно,
+а старые карточки просто истекают.
+
+Карточки страницы читаются одним ``cache.get_many``; отрисовываются
+только промахи. Кнопка подписки зависит от зрителя, поэтому в кеш
+попадает метка FOLLOW_SLOT, а кнопка подставляется при сборке.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+FOLLOW_TEMPLATE = 'posts/includes/follow_button.html'
+FOLLOW_SLOT = mark_safe('<!-- follow-button -->')
+
+
+def fingerprint(post):
+    author, group = post.author, post.group
+    thumb = getattr(post, 'thumb', None)
+    parts = (
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name if post.image else '',
+        thumb['url'] if thumb else '',
+        group.slug if group else '',
+        author.username,
+        author.get_full_name(),
+    )
+    return hashlib.md5('\x1f'.join(parts).encode()).hexdigest()[:12]
+
+
+def cache_key(post, show_author):
+    return f'posts:card:{post.pk}:{int(show_author)}:{fingerprint(post)}'
+
+
+def render(context, posts, show_author=True, follow_button=True):
+    """Возвращает HTML карточек ``posts`` в том же порядке.
+
+    ``context`` — контекст страницы: из него берутся шаблонизатор,
+    пользователь и его подписки.
+    """
+    posts = list(posts)
+    engine = context.template.engine
+    keys = [cache_key(post, show_author) for post in posts]
+    fragments = cache.get_many(keys)
+    missing = {}
+    card = engine.get_template(CARD_TEMPLATE)
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            fragments[key] = missing[key] = card.render(context.new({
+                'post': post,
+                'show_author': show_author,
+                'follow_slot': FOLLOW_SLOT,
+            }))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+
+    user = context.get('user')
+    buttons = {}
+    if show_author and follow_button and user and user.is_authenticated:
+        button = engine.get_template(FOLLOW_TEMPLATE)
+        for post in posts:
+            if post.author_id not in buttons:
+                buttons[post.author_id] = button.render(context.new({
+                    'user': user,
+                    'author': post.author,
+                    'followed_authors': context.get('followed_authors'),
+                }))
+    return [
+        mark_safe(fragments[key].replace(
+            FOLLOW_SLOT, buttons.get(post.author_id, ''), 1
+        ))
+        for post, key in zip(posts, keys)
+    ]
@@ -0,0 +1,86 @@
+"""ETag для условных GET-запросов к лентам и страницам постов.
+
+Метки считаются из версий posts.caching и пары лёгких запросов по
+индексам, без отрисовки шаблонов. Страницы зависят от того, кто их
+смотрит (переключатель лент, кнопка подписки, форма комментария),
+поэтому в метку входят пользователь и версия его подписок, а ответы
+варьируются по Cookie.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from . import caching, follows
+from .models import Comment, Group, Post, User
+
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def _etag(request, *parts, params=PAGE_PARAMS):
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    values = [str(viewer), *map(str, parts)]
+    values.extend(request.GET.get(name, '') for name in params)
+    return hashlib.md5('|'.join(values).encode()).hexdigest()
+
+
+def _feed_etag(request, scope, *parts):
+    return _etag(
+        request, caching.get_version(*caching.feed_scopes(scope)), *parts
+    )
+
+
+def index_etag(request):
+    return _feed_etag(request, 'index', follows.for_request(request).version)
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return _feed_etag(
+        request, f'group:{group_id}', follows.for_request(request).version
+    )
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    following = author_id in follows.for_request(request)
+    return _feed_etag(request, f'author:{author_id}', following)
+
+
+def post_etag(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    comments = Comment.objects.filter(post_id=post_id).aggregate(
+        last=Max('id'), total=Count('id')
+    )
+    return _etag(
+        request,
+        caching.get_version(*caching.feed_scopes(f'author:{author_id}')),
+        comments['last'],
+        comments['total'],
+        # Страница содержит форму с CSRF-токеном, привязанным к cookie.
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        params=('comments_after',),
+    )
+
+
+def conditional(etag_func):
+    """Отвечает 304, пока метка не изменилась; клиент всегда сверяется."""
+    def decorator(view):
+        view = condition(etag_func=etag_func)(view)
+        return cache_control(no_cache=True)(vary_on_cookie(view))
+    return decorator
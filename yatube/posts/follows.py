@@ -0,0 +1,66 @@
+"""Множество авторов, на которых подписан пользователь.
+
+Загружается одним запросом, кешируется по пользователю и один раз
+за запрос запоминается в ``request``; сигналы подписки сбрасывают
+кеш. Шаблоны проверяют подписку выражением
+``post.author_id in followed_authors`` без обращений к БД.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+
+class FollowSet:
+    def __init__(self, author_ids):
+        self.author_ids = frozenset(author_ids)
+        # Версия зависит только от содержимого и у разных пользователей
+        # с одинаковыми подписками совпадает: в ключах кеша и ETag
+        # страниц с кнопками подписки она идёт вместе с id зрителя.
+        self.version = hashlib.md5(
+            ','.join(map(str, sorted(self.author_ids))).encode()
+        ).hexdigest()[:12]
+
+    def __contains__(self, author_id):
+        return author_id in self.author_ids
+
+    def __len__(self):
+        return len(self.author_ids)
+
+
+ANONYMOUS = FollowSet(())
+
+
+def _key(user_id):
+    return f'posts:follows:{user_id}'
+
+
+def load(user_id):
+    key = _key(user_id)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, author_ids, settings.FOLLOW_SET_CACHE_TIMEOUT)
+    return FollowSet(author_ids)
+
+
+def invalidate(*user_ids):
+    """Сбрасывает кеш подписок после коммита, как ``caching.bump``."""
+    keys = [_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def for_request(request):
+    """Подписки текущего пользователя, не больше одной загрузки за запрос."""
+    if not request.user.is_authenticated:
+        return ANONYMOUS
+    if not hasattr(request, '_follow_set'):
+        request._follow_set = load(request.user.pk)
+    return request._follow_set
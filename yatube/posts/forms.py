@@ -1,4 +1,7 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 from django.utils.translation import ugettext_lazy as _
 
 from .models import Post, Comment
@@ -19,6 +22,28 @@ class PostForm(forms.ModelForm):
             'image': _('Изображение к посту'),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Без новой загрузки здесь уже сохранённый файл поста.
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                _('Файл больше %(limit)s'),
+                params={
+                    'limit': filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)
+                },
+            )
+        # ImageField уже прочитал заголовок: размер известен без
+        # распаковки всего изображения.
+        width, height = image.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                _('Изображение больше %(limit)s мегапикселей'),
+                params={'limit': settings.IMAGE_MAX_PIXELS // 10 ** 6},
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,102 @@
+"""Подготовка загруженных изображений постов.
+
+Оригинал поворачивается по EXIF, теряет метаданные (EXIF с GPS и
+моделью камеры), уменьшается до IMAGE_MAX_DIMENSION по большей стороне
+и пересохраняется: JPEG — прогрессивным, при IMAGE_FORMAT='WEBP' всё,
+кроме анимаций, — в WebP. Работа идёт в пуле миниатюр (см.
+posts.thumbnails), а не в потоке запроса.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .models import Post
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def save_options(image_format):
+    quality = settings.IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': quality, 'method': 6},
+    }[image_format]
+
+
+def target_format(source_format):
+    wanted = settings.IMAGE_FORMAT or source_format
+    if wanted == 'WEBP' and not features.check('webp'):
+        return source_format
+    return wanted
+
+
+def needs_processing(image, image_format):
+    return (
+        image_format != image.format
+        or max(image.size) > settings.IMAGE_MAX_DIMENSION
+        or 'exif' in image.info
+        or (image_format == 'JPEG' and not image.info.get('progressive'))
+    )
+
+
+def optimize(name, storage=default_storage):
+    """Обрабатывает оригинал и возвращает его имя (оно может смениться).
+
+    Уже обработанные файлы не трогает, поэтому повторный вызов не
+    пережимает JPEG ещё раз.
+    """
+    with storage.open(name) as file:
+        image = Image.open(file)
+        if getattr(image, 'is_animated', False):
+            return name
+        image_format = target_format(image.format)
+        if image_format not in EXTENSIONS:
+            return name
+        if not needs_processing(image, image_format):
+            return name
+        image = ImageOps.exif_transpose(image)
+        limit = settings.IMAGE_MAX_DIMENSION
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, image_format, **save_options(image_format))
+
+    root, extension = os.path.splitext(name)
+    new_name = f'{root}.{EXTENSIONS[image_format]}'
+    if extension.lower() in ('.jpeg', '.jpg') and image_format == 'JPEG':
+        new_name = name
+    if new_name == name:
+        return replace(name, buffer.getvalue(), storage)
+    # Оригинал удаляется только после того, как записан новый файл и
+    # пост указывает на него.
+    saved = storage.save(new_name, ContentFile(buffer.getvalue()))
+    Post.objects.filter(image=name).update(image=saved)
+    storage.delete(name)
+    return saved
+
+
+def replace(name, content, storage=default_storage):
+    """Подменяет содержимое файла, не удаляя оригинал раньше времени.
+
+    Новый файл пишется под временным именем и переносится на место
+    оригинала атомарным ``os.replace``: сбой записи оставляет оригинал
+    нетронутым, а читатели всё время видят целый файл. Хранилищам без
+    локальных путей переименовать нечем — пост переходит на новый
+    файл, и только потом удаляется старый.
+    """
+    root, extension = os.path.splitext(name)
+    temporary = storage.save(f'{root}.tmp{extension}', ContentFile(content))
+    try:
+        source, target = storage.path(temporary), storage.path(name)
+    except NotImplementedError:
+        Post.objects.filter(image=name).update(image=temporary)
+        storage.delete(name)
+        return temporary
+    os.replace(source, target)
+    return name
@@ -0,0 +1,123 @@
+import json
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse
+
+from core import warmup
+from core.benchmark import scratch_cache, summarize, timer, use_cache
+from posts import links
+from posts.management.commands.warm_templates import sample_context
+from posts.urls import app_name, urlpatterns
+
+SAMPLE_KWARGS = {'post_id': 12345, 'slug': 'group-slug', 'username': 'leo'}
+
+
+def reverse_url(name, **kwargs):
+    """Прежний способ: ``reverse()`` на каждый адрес."""
+    return reverse(f'{app_name}:{name}', kwargs=kwargs or None)
+
+
+def per_call(build, name, kwargs, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        build(name, **kwargs)
+    return (time.perf_counter() - start) / calls
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает reverse() и posts.links: стоимость одного адреса по '
+        'каждому маршруту и отрисовку главной страницы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_config = use_cache(scratch_cache(directory))
+            try:
+                self.report(options)
+            finally:
+                use_cache(cache_config)
+
+    def report(self, options):
+        settings.DEBUG = False
+        routes = {}
+        for pattern in urlpatterns:
+            kwargs = {
+                name: SAMPLE_KWARGS[name]
+                for name in pattern.pattern.converters
+            }
+            before = per_call(
+                reverse_url, pattern.name, kwargs, options['calls']
+            )
+            after = per_call(
+                links.url, pattern.name, kwargs, options['calls']
+            )
+            routes[pattern.name] = {
+                'reverse_us': round(before * 10 ** 6, 3),
+                'links_us': round(after * 10 ** 6, 3),
+            }
+        results = {
+            'routes': routes,
+            'index': {
+                'reverse': self.render_index(
+                    reverse_url, options['iterations']
+                ),
+                'links': self.render_index(
+                    links.url, options['iterations']
+                ),
+            },
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+        for name, result in routes.items():
+            self.stdout.write(
+                f'{name:20} reverse {result["reverse_us"]:8.3f} мкс  '
+                f'links {result["links_us"]:8.3f} мкс'
+            )
+        for variant, result in results['index'].items():
+            self.stdout.write(
+                f'index.html ({variant}): адресов {result["urls"]}, '
+                f'p50 {result["render"]["p50_ms"]} мс, '
+                f'p90 {result["render"]["p90_ms"]} мс'
+            )
+
+    def render_index(self, build, iterations):
+        """Отрисовка главной с пустым кешем карточек.
+
+        Вариант ``reverse`` подменяет построитель адресов в posts.links,
+        так что шаблоны те же, меняется только способ сборки адреса.
+        """
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = sample_context(request)
+        template = warmup.default_backend().get_template('posts/index.html')
+        calls = []
+
+        def counted(name, **kwargs):
+            calls.append(name)
+            return build(name, **kwargs)
+
+        samples = []
+        original = links.url
+        links.url = counted
+        try:
+            for _ in range(iterations):
+                cache.clear()
+                calls.clear()
+                with timer(samples):
+                    template.render(dict(context), request)
+        finally:
+            links.url = original
+        return {'urls': len(calls), 'render': summarize(samples)}
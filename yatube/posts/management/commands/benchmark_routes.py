@@ -0,0 +1,276 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmark import (percentile, scratch_cache, summarize, timer,
+                            use_cache, use_database)
+from posts import synthetic
+from posts.models import Group, Post, User
+from posts.urls import app_name, urlpatterns
+
+# Маршруты, которые меняют данные: в многопроцессном прогоне их нет.
+WRITE_ROUTES = {'add_comment', 'profile_follow', 'profile_unfollow'}
+POST_DATA = {
+    'add_comment': lambda rng: {'text': synthetic.sentence(rng, 10)},
+}
+QUERY_PARAMS = {
+    'search': lambda rng: {'q': rng.choice(synthetic.WORDS)},
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def quiet():
+    """Без панели отладки и журнала SQL, как на боевом сервере."""
+    settings.DEBUG = False
+    logging.getLogger('django.request').disabled = True
+
+
+def run_wsgi_worker(args):
+    """Один процесс: запросы напрямую в WSGI-приложение, без Client."""
+    cookie, requests = args
+    quiet()
+    connections.close_all()
+    application = get_wsgi_application()
+    factory = RequestFactory(HTTP_COOKIE=cookie)
+    samples = defaultdict(list)
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    for name, url, params in requests:
+        environ = factory.get(url, params).environ
+        with timer(samples[name]):
+            response = application(environ, start_response)
+            for _ in response:
+                pass
+            response.close()
+    connections.close_all()
+    return dict(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу синтетическими данными и замеряет '
+        'задержку и число SQL-запросов каждого маршрута posts/urls.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--exponent', type=float, default=1.2,
+            help='Показатель степенного закона активности и подписок.',
+        )
+        parser.add_argument('--max-follows', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько запросов к каждому маршруту.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=0,
+            help='Дополнительно прогнать GET-маршруты в N процессах.',
+        )
+        parser.add_argument('--output', help='Записать JSON в файл.')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        original = {
+            'DEBUG': settings.DEBUG,
+            'DATABASE_REPLICAS': settings.DATABASE_REPLICAS,
+        }
+        name = connections['default'].settings_dict['NAME']
+        settings.DATABASE_REPLICAS = []
+        quiet()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                cache_config = use_cache(scratch_cache(directory))
+                try:
+                    use_database(
+                        os.path.join(directory, 'benchmark.sqlite3')
+                    )
+                    call_command('migrate', verbosity=0, interactive=False)
+                    results = self.run(options)
+                finally:
+                    use_cache(cache_config)
+        finally:
+            use_database(name)
+            for setting, value in original.items():
+                setattr(settings, setting, value)
+            logging.getLogger('django.request').disabled = False
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        if options['json']:
+            self.stdout.write(output)
+            return
+        for route, result in results['routes'].items():
+            latency = result['latency']
+            self.stdout.write(
+                f"{route:>28}: p50 {latency['p50_ms']} ms, "
+                f"p99 {latency['p99_ms']} ms, "
+                f"запросов SQL {result['queries']['p50']}"
+                f"–{result['queries']['max']}"
+            )
+        if 'wsgi' in results:
+            self.stdout.write(
+                f"WSGI, процессов {results['wsgi']['processes']}: "
+                f"{results['wsgi']['throughput_rps']} req/s"
+            )
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        scale = synthetic.generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            exponent=options['exponent'],
+            max_follows=options['max_follows'],
+            seed=options['seed'],
+        )
+        scale.update(exponent=options['exponent'], seed=options['seed'])
+        results = {
+            'revision': git_revision(),
+            'scale': scale,
+            'seed_seconds': round(time.perf_counter() - started, 2),
+            'requests': options['requests'],
+        }
+        # Смотрим от лица самого активного читателя среди авторов:
+        # у него непустая лента подписок и есть свои посты для правки.
+        viewer = User.objects.filter(stats__posts__gt=0).order_by(
+            '-stats__following', 'pk'
+        ).first()
+        if viewer is None:
+            raise CommandError('Нужен хотя бы один пост.')
+        data = {
+            'slug': list(Group.objects.values_list('slug', flat=True)),
+            'username': list(
+                User.objects.exclude(pk=viewer.pk).values_list(
+                    'username', flat=True
+                )
+            ),
+            'post_id': list(Post.objects.values_list('pk', flat=True)),
+        }
+        own_posts = list(viewer.posts.values_list('pk', flat=True))
+        plan = []
+        for pattern in urlpatterns:
+            requests = []
+            for _ in range(options['requests']):
+                kwargs = {}
+                for key in pattern.pattern.converters:
+                    if key not in data:
+                        raise CommandError(
+                            f'Нет данных для параметра {key} '
+                            f'маршрута {pattern.name}'
+                        )
+                    choices = data[key]
+                    if pattern.name == 'post_edit':
+                        choices = own_posts
+                    kwargs[key] = rng.choice(choices)
+                params = QUERY_PARAMS.get(pattern.name, lambda rng: {})(rng)
+                requests.append((
+                    reverse(f'{app_name}:{pattern.name}', kwargs=kwargs),
+                    params,
+                ))
+            plan.append((pattern.name, requests))
+
+        client = Client()
+        client.force_login(viewer)
+        results['routes'] = {
+            f'{app_name}:{name}': self.measure(client, name, requests, rng)
+            for name, requests in plan
+        }
+        if options['processes']:
+            results['wsgi'] = self.run_wsgi(client, plan, options)
+        return results
+
+    def measure(self, client, name, requests, rng):
+        """Прогоняет запросы маршрута через Client, начиная с пустого кеша."""
+        cache.clear()
+        samples, queries, statuses = [], [], set()
+        for url, params in requests:
+            if name in POST_DATA:
+                params = POST_DATA[name](rng)
+            method = client.post if name in POST_DATA else client.get
+            with CaptureQueriesContext(connection) as captured:
+                with timer(samples):
+                    response = method(url, params)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        return {
+            'method': 'POST' if name in POST_DATA else 'GET',
+            'status': sorted(statuses),
+            'latency': summarize(samples),
+            'queries': {
+                'p50': percentile(queries, 50),
+                'max': max(queries),
+            },
+        }
+
+    def run_wsgi(self, client, plan, options):
+        cookie = '; '.join(
+            f'{key}={morsel.value}' for key, morsel in client.cookies.items()
+        )
+        requests = [
+            (f'{app_name}:{name}', url, params)
+            for name, route_requests in plan
+            if name not in WRITE_ROUTES
+            for url, params in route_requests
+        ]
+        jobs = []
+        for seed in range(options['processes']):
+            shuffled = list(requests)
+            random.Random(seed).shuffle(shuffled)
+            jobs.append((cookie, shuffled))
+        cache.clear()
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        started = time.perf_counter()
+        with context.Pool(options['processes']) as pool:
+            outcome = pool.map(run_wsgi_worker, jobs)
+        elapsed = time.perf_counter() - started
+        samples = defaultdict(list)
+        for worker in outcome:
+            for name, values in worker.items():
+                samples[name].extend(values)
+        total = sum(len(values) for values in samples.values())
+        return {
+            'processes': options['processes'],
+            'throughput_rps': round(total / elapsed, 1),
+            'routes': {
+                name: summarize(values)
+                for name, values in sorted(samples.items())
+            },
+        }
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models', nargs='+', default=list(transfer.MODELS),
+            choices=transfer.MODELS,
+        )
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'], default='ndjson',
+            help='В CSV выгружается ровно одна модель.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из БД за раз.',
+        )
+
+    def handle(self, *args, models, output, chunk_size, **options):
+        if options['format'] == 'csv' and len(models) != 1:
+            raise CommandError('Для CSV укажите одну модель в --models.')
+        stream = (
+            open(output, 'w', encoding='utf-8', newline='')
+            if output else self.stdout
+        )
+        try:
+            if options['format'] == 'csv':
+                total = transfer.write_csv(stream, models[0], chunk_size)
+            else:
+                total = transfer.write_ndjson(stream, models, chunk_size)
+        finally:
+            if output:
+                stream.close()
+        if output:
+            self.stdout.write(self.style.SUCCESS(
+                f'Выгружено строк: {total}'
+            ))
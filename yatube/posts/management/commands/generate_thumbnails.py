@@ -0,0 +1,53 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def process(name):
+    try:
+        return name, thumbnails.run_task(name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит миниатюры всех размеров для изображений постов '
+        'в нескольких процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов.',
+        )
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Только разобрать очередь ThumbnailTask.',
+        )
+
+    def handle(self, *args, workers, pending, **options):
+        names = set(thumbnails.pending())
+        if not pending:
+            names.update(
+                Post.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True).distinct()
+            )
+        # Соединения родителя нельзя делить с дочерними процессами.
+        connections.close_all()
+        done = failed = 0
+        context = multiprocessing.get_context('fork')
+        with context.Pool(max(workers, 1)) as pool:
+            for name, ok in pool.imap_unordered(process, sorted(names)):
+                if ok:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Не удалось обработать {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово изображений: {done}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,66 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из NDJSON или '
+        'CSV пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument(
+            '--model', choices=transfer.MODELS,
+            help='Модель строк CSV-файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк записывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='Откуда копировать изображения постов в MEDIA_ROOT.',
+        )
+
+    def handle(self, *args, path, model, batch_size, media_dir, **options):
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if file_format == 'csv' and model is None:
+            raise CommandError('Для CSV укажите --model.')
+        if media_dir and not os.path.isdir(media_dir):
+            raise CommandError(f'Нет каталога {media_dir}')
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        importer = transfer.Importer(batch_size, media_dir)
+        number = 0
+        try:
+            if file_format == 'csv':
+                rows = transfer.read_csv(stream, model)
+            else:
+                rows = transfer.read_ndjson(stream)
+            for number, row_model, row in rows:
+                importer.add(row_model, row)
+            importer.flush_all()
+        except (ValueError, KeyError, IntegrityError) as error:
+            raise CommandError(f'Строка {number}: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            counts = importer.finish()
+        summary = ', '.join(
+            f'{name}: {counts[name]}' for name in transfer.MODELS
+        )
+        self.stdout.write(self.style.SUCCESS(f'Загружено — {summary}'))
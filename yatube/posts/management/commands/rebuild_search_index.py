@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по текстам всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SEARCH_BATCH_SIZE,
+            help='Сколько постов индексировать за один проход.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        with transaction.atomic():
+            total = search.rebuild(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total} ({search.backend()})'
+        ))
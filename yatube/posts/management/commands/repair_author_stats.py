@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import AuthorStats, User
+from posts.stats import COUNTERS, annotate_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики AuthorStats и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пользователей обрабатывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не записывая.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        users = annotate_counters(User.objects.order_by('pk')).values(
+            'pk', *(f'stat_{name}' for name in COUNTERS)
+        )
+        checked = repaired = 0
+        batch = []
+        for row in users.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                repaired += self.repair(batch, dry_run)
+                checked += len(batch)
+                batch = []
+        if batch:
+            repaired += self.repair(batch, dry_run)
+            checked += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено авторов: {checked}, исправлено: {repaired}'
+        ))
+
+    def repair(self, rows, dry_run):
+        existing = AuthorStats.objects.in_bulk([row['pk'] for row in rows])
+        to_create, to_update = [], []
+        for row in rows:
+            actual = {name: row[f'stat_{name}'] for name in COUNTERS}
+            stats = existing.get(row['pk'])
+            if stats is None:
+                to_create.append(AuthorStats(author_id=row['pk'], **actual))
+                continue
+            if any(getattr(stats, k) != v for k, v in actual.items()):
+                for name, value in actual.items():
+                    setattr(stats, name, value)
+                to_update.append(stats)
+        if not dry_run:
+            with transaction.atomic():
+                AuthorStats.objects.bulk_create(to_create)
+                AuthorStats.objects.bulk_update(to_update, COUNTERS)
+        return len(to_create) + len(to_update)
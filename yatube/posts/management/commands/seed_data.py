@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--exponent', type=float, default=1.2,
+            help='Показатель степенного закона активности и подписок.',
+        )
+        parser.add_argument('--max-follows', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        counts = synthetic.generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            exponent=options['exponent'],
+            max_follows=options['max_follows'],
+            seed=options['seed'],
+        )
+        summary = ', '.join(
+            f'{name}: {total}' for name, total in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Создано — {summary}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги популярных постов и групп за '
+        'RANKING_WINDOW; запускается по расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        posts, groups = ranking.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги обновлены: постов {posts}, групп {groups}'
+        ))
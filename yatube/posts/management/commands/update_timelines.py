@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает посты авторов, вернувшихся под '
+        'TIMELINE_FANOUT_LIMIT, и подрезает ленты подписчиков до '
+        'TIMELINE_LENGTH записей; запускается по расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        resumed = timeline.resume_paused()
+        trimmed = timeline.trim_overflowing()
+        self.stdout.write(self.style.SUCCESS(
+            f'Раскладка возобновлена: авторов {resumed}; '
+            f'ленты подрезаны: пользователей {trimmed}'
+        ))
@@ -0,0 +1,143 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from core import warmup
+from core.benchmark import summarize, timer
+from posts import thumbnails
+from posts.forms import CommentForm, PostForm
+from posts.models import Post, User
+from posts.paginators import paginate
+from posts.stats import get_stats
+from posts.views import comments_page
+
+
+def sample_context(request):
+    """Контекст, общий для всех шаблонов, по первой странице ленты."""
+    page_obj = paginate(request, Post.objects.for_feed())
+    thumbnails.attach_thumbnails(page_obj.object_list)
+    context = {
+        'page_obj': page_obj,
+        'form': PostForm(),
+        'comment_form': CommentForm(),
+        'query': '',
+        'cursor_params': '',
+        # Фрагментный кеш лент не должен подменять отрисовку.
+        'feed_cache_timeout': 0,
+        'feed_version': 'warmup',
+    }
+    post = page_obj.object_list[0] if page_obj.object_list else None
+    if post is not None:
+        context.update({
+            'post': post,
+            'post_id': post.pk,
+            'author': post.author,
+            'group': post.group,
+            'post_count': get_stats(post.author).posts,
+            'comments': comments_page(post.pk),
+        })
+    return context
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны в кеш загрузчика и замеряет время '
+        'компиляции и отрисовки каждого шаблона проекта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'templates', nargs='*',
+            help='Шаблоны для замера отрисовки; по умолчанию все из DIRS.',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=100,
+            help='Сколько раз отрисовать каждый шаблон; 0 — только прогрев.',
+        )
+        parser.add_argument(
+            '--user', help='Отрисовывать от имени этого пользователя.'
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        # Без панели отладки и журнала SQL, как на боевом сервере.
+        settings.DEBUG = False
+        backend = warmup.default_backend()
+        engine = backend.engine
+        warmup.reset(engine)
+        compiled = warmup.warm(engine)
+        errors = {
+            name: repr(error) for name, error in compiled.items()
+            if isinstance(error, Exception)
+        }
+        results = {
+            'template_cache': settings.TEMPLATE_CACHE,
+            'compiled': len(compiled) - len(errors),
+            'compile': summarize([
+                seconds for seconds in compiled.values()
+                if not isinstance(seconds, Exception)
+            ]),
+            'errors': errors,
+            'templates': {},
+        }
+        if options['iterations'] > 0:
+            names = options['templates'] or warmup.template_names(
+                engine, backend.dirs
+            )
+            request = RequestFactory().get('/')
+            request.user = self.get_user(options['user'])
+            context = sample_context(request)
+            for name in names:
+                if name not in compiled:
+                    raise CommandError(f'Шаблон {name} не найден')
+                if name in errors:
+                    continue
+                results['templates'][name] = self.benchmark(
+                    backend.get_template(name), context, request,
+                    options['iterations'],
+                )
+                results['templates'][name]['compile_ms'] = round(
+                    compiled[name] * 1000, 3
+                )
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+        self.stdout.write(
+            f'Скомпилировано шаблонов: {results["compiled"]}, '
+            f'p50 {results["compile"].get("p50_ms")} мс '
+            f'(кеш шаблонов: {"да" if settings.TEMPLATE_CACHE else "нет"})'
+        )
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        for name, result in results['templates'].items():
+            if 'error' in result:
+                self.stdout.write(f'{name:45} ошибка: {result["error"]}')
+                continue
+            self.stdout.write(
+                f'{name:45} компиляция {result["compile_ms"]:8.3f} мс  '
+                f'отрисовка p50 {result["p50_ms"]:8.3f} мс  '
+                f'p90 {result["p90_ms"]:8.3f} мс'
+            )
+
+    def get_user(self, username):
+        if username is None:
+            return AnonymousUser()
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден')
+
+    def benchmark(self, template, context, request, iterations):
+        samples = []
+        try:
+            for _ in range(iterations):
+                with timer(samples):
+                    template.render(dict(context), request)
+        except Exception as error:
+            # Шаблону мог понадобиться контекст, которого нет в общем
+            # наборе: это не повод прерывать замер остальных.
+            return {'error': repr(error)}
+        return summarize(samples)
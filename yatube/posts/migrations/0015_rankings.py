@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupRanking',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='posts.Group')),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostRanking',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='posts.Post')),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postranking',
+            index=models.Index(fields=['score'], name='post_ranking_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupranking',
+            index=models.Index(fields=['score'], name='group_ranking_score_idx'),
+        ),
+    ]
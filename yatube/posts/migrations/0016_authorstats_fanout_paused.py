@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def pause_celebrities(apps, schema_editor):
+    # Посты нынешних «знаменитостей» могли не попасть в ленты.
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(fanout_paused=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_rankings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanout_paused',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(pause_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,36 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self, comment_count=False):
+        """Посты для лент: автор и группа одним запросом, без лишних полей.
+
+        С ``comment_count=True`` у каждого поста есть ``comment_count``.
+        """
+        queryset = self.select_related('author', 'group').defer(
+            'author__password',
+            'author__email',
+            'author__last_login',
+            'author__date_joined',
+            'group__description',
+        )
+        if comment_count:
+            comments = Comment.objects.filter(
+                post=OuterRef('pk')
+            ).order_by().values('post').annotate(
+                total=Count('pk')
+            ).values('total')
+            queryset = queryset.annotate(
+                comment_count=Coalesce(Subquery(comments), 0)
+            )
+        return queryset
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -25,11 +52,27 @@ class Post(models.Model):
         null=True,
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:15]
 
     class Meta():
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -61,6 +104,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -85,6 +134,145 @@ class Follow(models.Model):
                 name='unique_follow'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return '{} follows {}'.format(self.user, self.author)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='timeline_user_feed_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return '{} sees {}'.format(self.user, self.post_id)
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts = models.PositiveIntegerField(default=0)
+    comments_received = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    # Раскладка пропускала посты автора: пока флаг стоит, они
+    # подмешиваются в ленты при чтении.
+    fanout_paused = models.BooleanField(default=False)
+
+    def __str__(self):
+        return 'stats of {}'.format(self.author_id)
+
+
+class ThumbnailTask(models.Model):
+    image = models.CharField(max_length=255, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ('created',)
+
+    def __str__(self):
+        return self.image
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса: основа слова в тексте поста.
+
+    Используется поиском, когда в SQLite нет FTS5 или база другая.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term'
+            ),
+        ]
+
+    def __str__(self):
+        return '{} in {}'.format(self.term, self.post_id)
+
+
+class PostRanking(models.Model):
+    """Рейтинг поста для /popular/, см. posts.ranking."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        # По возрастанию: при обратном обходе пары (score, post_id) идут
+        # по убыванию, и сортировка во временной таблице не нужна.
+        indexes = [
+            models.Index(fields=['score'], name='post_ranking_score_idx'),
+        ]
+
+    def __str__(self):
+        return 'ranking of {}'.format(self.post_id)
+
+
+class GroupRanking(models.Model):
+    """Рейтинг группы для блока «Группы в тренде»."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['score'], name='group_ranking_score_idx'),
+        ]
+
+    def __str__(self):
+        return 'ranking of {}'.format(self.group_id)
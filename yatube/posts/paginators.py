@@ -0,0 +1,191 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+page_count = settings.PER_PAGE_COUNT
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def _json_default(value):
+    # DjangoJSONEncoder обрезает микросекунды, а курсору нужна точность.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Раскодирует токен курсора; для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: не знает ни номера, ни общего числа."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу сортировки без COUNT(*) и OFFSET.
+
+    Страница выбирается условием вида ``(pub_date, id) < (x, y)``,
+    поэтому время ответа не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        # По умолчанию — явная сортировка queryset, иначе порядок лент.
+        self.ordering = tuple(
+            ordering or object_list.query.order_by or FEED_ORDERING
+        )
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    def _fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name in self._fields()])
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if values is None or len(values) != len(self.ordering):
+            return None
+        try:
+            return [
+                self._field(name).to_python(value)
+                for name, value in zip(self._fields(), values)
+            ]
+        except Exception:
+            return None
+
+    def _field(self, name):
+        """Поле модели или аннотации, по которому идёт сортировка."""
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _seek(self, values, forward):
+        """Условие «строго после» (или «строго до») ключа ``values``."""
+        conditions = []
+        for i, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            exact = {
+                prev.lstrip('-'): value
+                for prev, value in zip(self.ordering[:i], values[:i])
+            }
+            exact[f'{field}__{lookup}'] = values[i]
+            conditions.append(Q(**exact))
+        # Избыточная граница по первому полю даёт СУБД искать по индексу,
+        # а не перебирать его с начала до нужной строки.
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') == forward else 'gte'
+        bound = Q(**{f'{first.lstrip("-")}__{lookup}': values[0]})
+        return bound & reduce(or_, conditions)
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def get_cursor_page(self, after=None, before=None):
+        after_values = self._parse(after)
+        before_values = None if after_values else self._parse(before)
+        queryset = self.object_list
+        if before_values is not None:
+            queryset = queryset.filter(
+                self._seek(before_values, forward=False)
+            ).order_by(*self._reversed_ordering())
+            rows = list(queryset[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(
+                rows,
+                self,
+                next_cursor=self._cursor_for(rows[-1]) if rows else None,
+                previous_cursor=(
+                    self._cursor_for(rows[0]) if has_more else None
+                ),
+            )
+        if after_values is not None:
+            queryset = queryset.filter(self._seek(after_values, forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        previous_cursor = None
+        if after_values is not None and rows:
+            previous_cursor = self._cursor_for(rows[0])
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self._cursor_for(rows[-1]) if has_more else None,
+            previous_cursor=previous_cursor,
+        )
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор с заранее известным числом объектов вместо COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
+
+
+def paginate(request, queryset, count=None):
+    """Курсорная страница при ``?after=``/``?before=``, иначе обычная.
+
+    ``count`` — уже известное число объектов (например, из AuthorStats).
+    """
+    if 'after' in request.GET or 'before' in request.GET:
+        paginator = CursorPaginator(queryset, page_count)
+        return paginator.get_cursor_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    if count is None:
+        paginator = Paginator(queryset, page_count)
+    else:
+        paginator = CountedPaginator(queryset, page_count, count)
+    return paginator.get_page(request.GET.get('page'))
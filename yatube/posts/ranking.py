@@ -0,0 +1,147 @@
+"""Рейтинги популярных постов и групп с затуханием во времени.
+
+Каждое событие (публикация поста, комментарий) даёт вклад
+``weight * 2 ** (-age / RANKING_HALF_LIFE)``. Чтобы не пересчитывать
+возраст всех событий при каждом чтении, в таблице хранится логарифм
+суммы вкладов, отсчитанных от общей точки EPOCH:
+``log(sum(weight * exp(rate * (t - EPOCH))))``. Затухание до текущего
+момента одинаково делит все суммы, поэтому порядок по хранимому
+значению совпадает с порядком по текущему рейтингу, а новое событие
+прибавляется к строке без чтения истории.
+
+Сигналы обновляют рейтинги при каждом посте и комментарии; команда
+update_rankings пересчитывает их с нуля за RANKING_WINDOW и убирает
+устаревшие строки.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (AuthorStats, Comment, GroupRanking, Post,
+                     PostRanking)
+
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+RANKING_ORDERING = ('-rank_score', '-rank_id')
+
+
+def event_score(weight, when):
+    """Вклад события в логарифмической шкале."""
+    rate = math.log(2) / settings.RANKING_HALF_LIFE
+    return math.log(weight) + rate * (when - EPOCH).total_seconds()
+
+
+def combine(first, second):
+    """``log(exp(first) + exp(second))`` без переполнения."""
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def post_weight(followers):
+    """Вес публикации: посты популярных авторов стартуют выше."""
+    return 1 + settings.RANKING_FOLLOWER_WEIGHT * math.log1p(followers)
+
+
+def _add(model, key, value):
+    ranking, created = model.objects.select_for_update().get_or_create(
+        pk=key, defaults={'score': value}
+    )
+    if not created:
+        ranking.score = combine(ranking.score, value)
+        ranking.save(update_fields=['score'])
+
+
+@transaction.atomic
+def record(post_id, group_id, value):
+    _add(PostRanking, post_id, value)
+    if group_id is not None:
+        _add(GroupRanking, group_id, value)
+
+
+def record_post(post):
+    followers = AuthorStats.objects.filter(
+        author_id=post.author_id
+    ).values_list('followers', flat=True).first() or 0
+    record(
+        post.pk, post.group_id,
+        event_score(post_weight(followers), post.pub_date),
+    )
+
+
+def record_comment(comment):
+    group_id = Post.objects.filter(pk=comment.post_id).values_list(
+        'group_id', flat=True
+    ).first()
+    record(
+        comment.post_id, group_id,
+        event_score(settings.RANKING_COMMENT_WEIGHT, comment.created),
+    )
+
+
+def rebuild(now=None):
+    """Пересчитывает рейтинги по событиям за RANKING_WINDOW."""
+    since = (now or timezone.now()) - timedelta(
+        seconds=settings.RANKING_WINDOW
+    )
+    posts = {}
+    groups = defaultdict(lambda: None)
+    recent = Post.objects.filter(pub_date__gte=since).order_by().values_list(
+        'pk', 'group_id', 'pub_date', 'author__stats__followers'
+    )
+    for post_id, group_id, pub_date, followers in recent.iterator():
+        value = event_score(post_weight(followers or 0), pub_date)
+        posts[post_id] = value
+        if group_id is not None:
+            groups[group_id] = combine(groups[group_id], value)
+    comments = Comment.objects.filter(
+        post__pub_date__gte=since
+    ).order_by().values_list('post_id', 'post__group_id', 'created')
+    weight = settings.RANKING_COMMENT_WEIGHT
+    for post_id, group_id, created in comments.iterator():
+        value = event_score(weight, created)
+        posts[post_id] = combine(posts.get(post_id), value)
+        if group_id is not None:
+            groups[group_id] = combine(groups[group_id], value)
+    with transaction.atomic():
+        PostRanking.objects.all().delete()
+        GroupRanking.objects.all().delete()
+        PostRanking.objects.bulk_create(
+            (PostRanking(post_id=key, score=value)
+             for key, value in posts.items()),
+            batch_size=500,
+        )
+        GroupRanking.objects.bulk_create(
+            (GroupRanking(group_id=key, score=value)
+             for key, value in groups.items()),
+            batch_size=500,
+        )
+    return len(posts), len(groups)
+
+
+def popular_posts():
+    """Посты в порядке рейтинга.
+
+    Сортировка по аннотациям, а не по ``ranking__score``: так с
+    запросом работает и курсорная пагинация. Пара (score, post_id)
+    совпадает с индексом по score, где post_id — rowid строки.
+    """
+    return Post.objects.for_feed().filter(ranking__isnull=False).annotate(
+        rank_score=F('ranking__score'),
+        rank_id=F('ranking__post'),
+    ).order_by(*RANKING_ORDERING)
+
+
+def trending_groups(limit):
+    """Группы с наибольшим рейтингом — один запрос по индексу."""
+    return [
+        ranking.group for ranking in
+        GroupRanking.objects.select_related('group').order_by(
+            '-score'
+        )[:limit]
+    ]
@@ -0,0 +1,374 @@
+"""Полнотекстовый поиск по постам.
+
+Слова приводятся к основам стеммером Snowball для русского языка и
+индексируются в виртуальной таблице SQLite FTS5 с ранжированием BM25.
+Если FTS5 недоступна, работает инвертированный индекс в таблице
+SearchTerm с весами TF-IDF. Индекс обновляют сигналы постов.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When,
+)
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from .models import Post, SearchTerm
+from .paginators import CursorPage, decode_cursor, encode_cursor
+
+FTS_TABLE = 'posts_search'
+TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+_VOWELS = 'аеиоуыэюя'
+_PERFECTIVE_GERUND = re.compile(
+    r'(ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(в|вши|вшись))$'
+)
+_REFLEXIVE = re.compile(r'(ся|сь)$')
+_ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+_PARTICIPLE = re.compile(r'(ивш|ывш|ующ|(?<=[ая])(ем|нн|вш|ющ|щ))$')
+_VERB = re.compile(
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю|'
+    r'(?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|'
+    r'ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ья|я)$'
+)
+_DERIVATIONAL = re.compile(r'ость?$')
+_SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+_WORD = re.compile(r'\w+')
+
+_fts5 = None
+
+
+def _cut(pattern, text):
+    match = pattern.search(text)
+    if match is None:
+        return text, False
+    return text[:match.start()], True
+
+
+def _region_after_vowel(word, start):
+    """Начало области после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа слова по алгоритму Snowball для русского языка.
+
+    Слова без русских гласных (латиница, числа) не меняются.
+    """
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in _VOWELS), None
+    )
+    if rv_start is None:
+        return word
+    r2 = _region_after_vowel(word, _region_after_vowel(word, 0))
+    head, rv = word[:rv_start], word[rv_start:]
+
+    rv, found = _cut(_PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _cut(_REFLEXIVE, rv)
+        rv, found = _cut(_ADJECTIVE, rv)
+        if found:
+            rv, _ = _cut(_PARTICIPLE, rv)
+        else:
+            rv, found = _cut(_VERB, rv)
+            if not found:
+                rv, _ = _cut(_NOUN, rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = _DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2:
+        rv = rv[:match.start()]
+    rv, found = _cut(_SUPERLATIVE, rv)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return head + rv
+
+
+def tokenize(text):
+    """Основы всех слов текста в порядке появления."""
+    return [stem(word)[:TERM_LENGTH] for word in _WORD.findall(text.lower())]
+
+
+def fts5_available():
+    """Собран ли SQLite текущего соединения с модулем FTS5."""
+    global _fts5
+    if _fts5 is None:
+        _fts5 = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+                )
+                _fts5 = bool(cursor.fetchone()[0])
+    return _fts5
+
+
+def backend():
+    """Действующий способ индексации: 'fts5' или 'index'."""
+    if settings.SEARCH_BACKEND == 'auto':
+        return 'fts5' if fts5_available() else 'index'
+    return settings.SEARCH_BACKEND
+
+
+def create_fts_table():
+    if not fts5_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f"USING fts5(body, tokenize='unicode61 remove_diacritics 0')"
+        )
+
+
+def drop_fts_table():
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def remove_many(post_ids, model=SearchTerm):
+    post_ids = list(post_ids)
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(post_id,) for post_id in post_ids],
+            )
+    else:
+        model.objects.filter(post_id__in=post_ids).delete()
+
+
+def index_many(rows, model=SearchTerm):
+    """Переиндексирует посты по парам ``(id, текст)``.
+
+    ``model`` — модель SearchTerm; миграции передают историческую.
+    """
+    rows = list(rows)
+    remove_many((post_id for post_id, _ in rows), model)
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                [
+                    (post_id, ' '.join(tokenize(text)))
+                    for post_id, text in rows
+                ],
+            )
+        return
+    model.objects.bulk_create(
+        [
+            model(term=term, post_id=post_id, count=count)
+            for post_id, text in rows
+            for term, count in Counter(tokenize(text)).items()
+        ],
+        batch_size=settings.SEARCH_BATCH_SIZE,
+    )
+
+
+def index_post(post):
+    index_many([(post.pk, post.text)])
+
+
+def remove_post(post):
+    remove_many([post.pk])
+
+
+def rebuild(batch_size=None):
+    """Строит индекс заново для всех постов; возвращает их число."""
+    batch_size = batch_size or settings.SEARCH_BATCH_SIZE
+    if backend() == 'fts5':
+        create_fts_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    total = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'text')[:batch_size]
+        )
+        if not rows:
+            return total
+        index_many(rows)
+        total += len(rows)
+        last_pk = rows[-1][0]
+
+
+def _match_expression(terms):
+    """Запрос FTS5: все основы обязательны, каждая в кавычках."""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _scored_terms(terms):
+    """Группы SearchTerm по постам с весом TF-IDF в поле ``score``.
+
+    Меньший ``score`` — более релевантный пост, как у bm25() в FTS5.
+    Возвращает None, если какой-то основы нет ни в одном посте.
+    """
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms).values_list('term')
+        .annotate(Count('pk'))
+    )
+    if len(frequencies) < len(terms):
+        return None
+    total = Post.objects.count()
+    weights = [
+        When(term=term, then=ExpressionWrapper(
+            F('count') * Value(-math.log(1 + total / frequency)),
+            output_field=FloatField(),
+        ))
+        for term, frequency in frequencies.items()
+    ]
+    return SearchTerm.objects.filter(term__in=terms).values('post').annotate(
+        matched=Count('pk'),
+        score=Sum(Case(*weights, output_field=FloatField())),
+    ).filter(matched=len(terms))
+
+
+def filter_posts(queryset, query):
+    """Оставляет в ``queryset`` только посты, подходящие под запрос."""
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return queryset.none()
+    if backend() == 'fts5':
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [_match_expression(terms)],
+        ))
+    scored = _scored_terms(terms)
+    if scored is None:
+        return queryset.none()
+    return queryset.filter(pk__in=scored.values('post'))
+
+
+class SearchPaginator(Paginator):
+    """Выдача поиска по релевантности с курсором ``(score, id)``.
+
+    Как и CursorPaginator, не считает COUNT(*) и не использует OFFSET:
+    следующая страница начинается строго после последнего результата.
+    """
+
+    def __init__(self, query, per_page):
+        self.query = query
+        self.terms = sorted(set(tokenize(query)))
+        super().__init__(Post.objects.for_feed(), per_page)
+
+    @cached_property
+    def count(self):
+        if not self.terms:
+            return 0
+        if backend() == 'fts5':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s',
+                    [_match_expression(self.terms)],
+                )
+                return cursor.fetchone()[0]
+        scored = _scored_terms(self.terms)
+        return 0 if scored is None else scored.count()
+
+    def _fts_hits(self, key, forward, limit):
+        operator, order = ('>', 'ASC') if forward else ('<', 'DESC')
+        sql = (
+            f'SELECT post_id, score FROM (SELECT rowid AS post_id, '
+            f'bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [_match_expression(self.terms)]
+        if key is not None:
+            sql += (
+                f' WHERE score {operator} %s '
+                f'OR (score = %s AND post_id {operator} %s)'
+            )
+            params += [key[0], key[0], key[1]]
+        sql += f' ORDER BY score {order}, post_id {order} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _index_hits(self, key, forward, limit):
+        scored = _scored_terms(self.terms)
+        if scored is None:
+            return []
+        lookup = 'gt' if forward else 'lt'
+        if key is not None:
+            scored = scored.filter(
+                Q(**{f'score__{lookup}': key[0]})
+                | Q(**{'score': key[0], f'post__{lookup}': key[1]})
+            )
+        # post_id, а не post: иначе сортировка пойдёт по Post.Meta.ordering.
+        ordering = (
+            ('score', 'post_id') if forward else ('-score', '-post_id')
+        )
+        return list(
+            scored.order_by(*ordering).values_list('post', 'score')[:limit]
+        )
+
+    def _hits(self, key, forward, limit):
+        """Пары ``(id поста, score)`` строго после (или до) ``key``."""
+        if not self.terms:
+            return []
+        if backend() == 'fts5':
+            return self._fts_hits(key, forward, limit)
+        return self._index_hits(key, forward, limit)
+
+    def _cursor(self, row):
+        post_id, score = row
+        return encode_cursor([score, post_id])
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if values is None or len(values) != 2:
+            return None
+        try:
+            return float(values[0]), int(values[1])
+        except (TypeError, ValueError):
+            return None
+
+    def get_cursor_page(self, after=None, before=None):
+        after_key = self._parse(after)
+        before_key = None if after_key else self._parse(before)
+        forward = before_key is None
+        rows = self._hits(
+            after_key if forward else before_key, forward, self.per_page + 1
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            next_cursor = self._cursor(rows[-1]) if has_more else None
+            previous_cursor = (
+                self._cursor(rows[0]) if after_key and rows else None
+            )
+        else:
+            rows.reverse()
+            next_cursor = self._cursor(rows[-1]) if rows else None
+            previous_cursor = self._cursor(rows[0]) if has_more else None
+        posts = self.object_list.in_bulk([post_id for post_id, _ in rows])
+        return CursorPage(
+            [posts[post_id] for post_id, _ in rows if post_id in posts],
+            self,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, follows, ranking, search, stats, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые видны в лентах.
+USER_FEED_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.increment(instance.author_id, 'posts')
+        timeline.fan_out(instance)
+        ranking.record_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_invalidate_feeds(sender, instance, **kwargs):
+    caching.bump(*caching.post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+
+
+@receiver(post_save, sender=Post)
+def post_index_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields and 'text' not in update_fields:
+        return
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'posts')
+    caching.bump(*caching.post_scopes(instance))
+    search.remove_post(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate_feeds(sender, instance, **kwargs):
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_invalidate_feeds(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login — ленты не меняются.
+    if update_fields and not USER_FEED_FIELDS & set(update_fields):
+        return
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.increment(instance.post.author_id, 'comments_received')
+        ranking.record_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    author_id = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is not None:
+        stats.decrement(author_id, 'comments_received')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.increment(instance.author_id, 'followers')
+        stats.increment(instance.user_id, 'following')
+        timeline.backfill(instance.user_id, instance.author_id)
+        follows.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'followers')
+    stats.decrement(instance.user_id, 'following')
+    timeline.remove(instance.user_id, instance.author_id)
+    follows.invalidate(instance.user_id)
@@ -0,0 +1,67 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+COUNTERS = ('posts', 'comments_received', 'followers', 'following')
+
+
+def _count(queryset, field):
+    """Подзапрос с числом строк ``queryset`` для ``OuterRef('pk')``."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def annotate_counters(users):
+    return users.annotate(
+        stat_posts=_count(Post.objects.all(), 'author'),
+        stat_comments_received=_count(Comment.objects.all(), 'post__author'),
+        stat_followers=_count(Follow.objects.all(), 'author'),
+        stat_following=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def recompute(author_id):
+    """Пересчитывает счётчики автора по таблицам и сохраняет их."""
+    user = annotate_counters(User.objects.filter(pk=author_id)).first()
+    if user is None:
+        return None
+    stats, _ = AuthorStats.objects.update_or_create(
+        author_id=author_id,
+        defaults={
+            name: getattr(user, f'stat_{name}') for name in COUNTERS
+        },
+    )
+    return stats
+
+
+def get_stats(author):
+    try:
+        return AuthorStats.objects.get(author_id=author.pk)
+    except AuthorStats.DoesNotExist:
+        return recompute(author.pk)
+
+
+def increment(author_id, name):
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{name: F(name) + 1}
+    )
+    if not updated:
+        # Строки ещё нет: считаем сразу все счётчики по таблицам.
+        recompute(author_id)
+
+
+def decrement(author_id, name):
+    # При удалении пользователя его строка уже удалена каскадом,
+    # поэтому отсутствие строки здесь не ошибка.
+    AuthorStats.objects.filter(author_id=author_id, **{
+        f'{name}__gt': 0
+    }).update(**{name: F(name) - 1})
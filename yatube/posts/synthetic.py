@@ -0,0 +1,139 @@
+"""Синтетические данные для замеров производительности.
+
+Активность распределена по степенному закону: немногие авторы пишут
+большую часть постов и собирают большую часть подписчиков, немногие
+посты получают большую часть комментариев. Данные пишутся через
+bulk_create без сигналов, поэтому счётчики, ленты, рейтинги и
+поисковый индекс пересобираются в конце.
+"""
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from . import ranking, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'день', 'город', 'дорога', 'книга', 'утро', 'море', 'песня', 'поезд',
+    'лес', 'письмо', 'друг', 'работа', 'окно', 'зима', 'кофе', 'река',
+    'история', 'фото', 'вечер', 'музыка', 'сад', 'ветер', 'дом', 'небо',
+)
+BATCH_SIZE = 500
+
+
+def power_law_weights(count, exponent):
+    """Веса 1 / rank ** exponent: вес первого ранга самый большой."""
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def _follow_pairs(rng, user_ids, exponent, max_follows):
+    """Граф подписок со степенным распределением входящих степеней."""
+    cum_weights = list(
+        itertools.accumulate(power_law_weights(len(user_ids), exponent))
+    )
+    pairs = set()
+    for user_id in user_ids:
+        # Исходящие степени тоже неравномерны: большинство подписано
+        # на нескольких авторов, редкие — на многих.
+        wanted = min(int(rng.paretovariate(1.5)), max_follows)
+        for author_id in rng.choices(
+            user_ids, cum_weights=cum_weights, k=wanted
+        ):
+            if author_id != user_id:
+                pairs.add((user_id, author_id))
+    return sorted(pairs)
+
+
+@transaction.atomic
+def generate(users=100, groups=10, posts=1000, comments=3000,
+             exponent=1.2, max_follows=50, days=90, seed=0):
+    """Заполняет базу и возвращает число созданных объектов по типам."""
+    rng = random.Random(seed)
+    User.objects.bulk_create(
+        (User(username=f'user{number}') for number in range(users)),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.filter(
+            username__startswith='user'
+        ).order_by('pk').values_list('pk', flat=True)
+    )
+    Group.objects.bulk_create(
+        (
+            Group(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description=sentence(rng, 8),
+            )
+            for number in range(groups)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    # Часть постов публикуется без группы.
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+
+    authors = rng.choices(
+        user_ids, weights=power_law_weights(len(user_ids), exponent),
+        k=posts,
+    ) if user_ids else []
+    Post.objects.bulk_create(
+        (
+            Post(
+                author_id=author_id,
+                group_id=rng.choice(group_ids),
+                text=sentence(rng, rng.randint(5, 60)),
+            )
+            for author_id in authors
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    # pub_date заполняется auto_now_add, поэтому разносим даты отдельно.
+    now = timezone.now()
+    created = list(Post.objects.only('pk').order_by('pk'))
+    for post in created:
+        post.pub_date = now - timedelta(seconds=rng.uniform(0, days * 86400))
+    Post.objects.bulk_update(created, ['pub_date'], batch_size=BATCH_SIZE)
+
+    post_ids = [post.pk for post in created]
+    commented = rng.choices(
+        post_ids, weights=power_law_weights(len(post_ids), exponent),
+        k=comments,
+    ) if post_ids else []
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text=sentence(rng, rng.randint(3, 20)),
+            )
+            for post_id in commented
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    follows = _follow_pairs(rng, user_ids, exponent, max_follows)
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author) for user, author in follows),
+        batch_size=BATCH_SIZE,
+    )
+
+    call_command('repair_author_stats', stdout=io.StringIO())
+    for user_id in {user for user, _ in follows}:
+        timeline.rebuild(user_id)
+    search.rebuild()
+    ranking.rebuild()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids) - 1,
+        'posts': len(post_ids),
+        'comments': len(commented),
+        'follows': len(follows),
+    }
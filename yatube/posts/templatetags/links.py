@@ -0,0 +1,26 @@
+from django import template
+
+from posts import links
+
+register = template.Library()
+
+
+@register.simple_tag
+def posts_url(name, **kwargs):
+    """``{% posts_url 'post_detail' post_id=post.id %}`` без reverse()."""
+    return links.url(name, **kwargs)
+
+
+@register.filter
+def post_url(post):
+    return links.post_detail(post.pk)
+
+
+@register.filter
+def profile_url(user):
+    return links.profile(user.username)
+
+
+@register.filter
+def group_url(group):
+    return links.group(group.slug)
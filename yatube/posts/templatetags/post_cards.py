@@ -0,0 +1,15 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_author=True, follow_button=True):
+    """Карточки постов страницы: ``{% post_cards page_obj as cards %}``.
+
+    Готовые карточки берутся из кеша одним запросом, отрисовываются
+    только отсутствующие (см. posts.cards).
+    """
+    return cards.render(context, posts, show_author, follow_button)
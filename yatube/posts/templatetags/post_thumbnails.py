@@ -0,0 +1,20 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_thumbnail(image, alias):
+    """Готовая миниатюра размера ``alias`` или None.
+
+    Не генерирует изображение в запросе: при промахе ставит задачу
+    в фоновую очередь, а шаблон показывает оригинал.
+    """
+    if not image:
+        return None
+    thumbnail = thumbnails.cached_thumbnail(image, alias)
+    if thumbnail is None:
+        thumbnails.enqueue(image.name)
+    return thumbnail
@@ -0,0 +1,18 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from posts import ranking
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/trending_groups.html')
+def trending_groups():
+    """Блок «Группы в тренде»; список кешируется на короткое время."""
+    groups = cache.get_or_set(
+        'posts:trending_groups',
+        lambda: ranking.trending_groups(settings.TRENDING_GROUPS_COUNT),
+        settings.TRENDING_GROUPS_CACHE_TIMEOUT,
+    )
+    return {'groups': groups}
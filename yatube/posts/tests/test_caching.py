@@ -0,0 +1,108 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import caching
+from ..models import Group, Post
+from .utils import run_on_commit
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cached',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Первый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_served_without_db(self):
+        """Повторный запрос главной не обращается к БД."""
+        self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Первый пост')
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_writes_invalidate_feeds(self):
+        """Новый пост сразу виден на главной, в группе и в профиле."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:posts_name', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.client.get(url)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user, group=self.group, text='Второй пост'
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Второй пост')
+
+    def test_group_change_invalidates_old_group(self):
+        """Пост, перенесённый в другую группу, пропадает из старой."""
+        other = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        url = reverse('posts:posts_name', kwargs={'slug': self.group.slug})
+        self.assertContains(self.client.get(url), 'Первый пост')
+        self.post.group = other
+        with run_on_commit():
+            self.post.save()
+        self.assertNotContains(self.client.get(url), 'Первый пост')
+
+    def test_author_rename_invalidates_feeds(self):
+        """Смена имени автора сбрасывает закешированные ленты."""
+        self.client.get(reverse('posts:index'))
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        with run_on_commit():
+            self.user.save()
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Лев Толстой'
+        )
+
+    def test_bump_waits_for_commit(self):
+        """До коммита запрос читает старую версию и не кеширует новую."""
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Первый пост')
+        version = caching.get_version(*caching.feed_scopes('index'))
+        with run_on_commit():
+            Post.objects.create(author=self.user, text='Второй пост')
+            self.assertEqual(
+                caching.get_version(*caching.feed_scopes('index')), version
+            )
+            self.assertNotContains(self.client.get(url), 'Второй пост')
+        self.assertNotEqual(
+            caching.get_version(*caching.feed_scopes('index')), version
+        )
+        self.assertContains(self.client.get(url), 'Второй пост')
+
+    @override_settings(FEED_CACHE_TIMEOUT=20, FEED_VERSION_TIMEOUT=20)
+    def test_local_cache_versions_expire(self):
+        """С кешем процесса запись другого воркера видна через таймаут."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        # Сигналы этого процесса о такой записи не узнают.
+        Post.objects.filter(pk=self.post.pk).update(text='Из другого воркера')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with mock.patch('time.time', return_value=time.time() + 21):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Из другого воркера')
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow, Post
+from .utils import run_on_commit
+
+User = get_user_model()
+
+
+class FollowSetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def follow_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query for query in queries if 'posts_follow' in query['sql']
+        ]
+
+    def test_one_query_for_all_buttons(self):
+        """Кнопки всех постов ленты — один запрос, потом ни одного."""
+        response, queries = self.follow_queries(reverse('posts:index'))
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'Отписаться', count=1)
+        self.assertContains(response, 'Подписаться', count=2)
+        _, queries = self.follow_queries(
+            reverse('posts:profile', kwargs={'username': 'author1'})
+        )
+        self.assertEqual(queries, [])
+
+    def test_follow_invalidates(self):
+        """Подписка сбрасывает кеш, страницы и ETag обновляются."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with run_on_commit():
+            self.client.get(reverse(
+                'posts:profile_follow', kwargs={'username': 'author1'}
+            ))
+            # До коммита кеш подписок не сбрасывается.
+            self.assertNotIn(
+                self.authors[1].pk, follows.load(self.reader.pk)
+            )
+        self.assertIn(self.authors[1].pk, follows.load(self.reader.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться', count=2)
+
+        with run_on_commit():
+            self.client.get(reverse(
+                'posts:profile_unfollow', kwargs={'username': 'author0'}
+            ))
+        self.assertNotIn(self.authors[0].pk, follows.load(self.reader.pk))
+
+    def test_anonymous(self):
+        """Гостю кнопки не показываются и запросов к подпискам нет."""
+        self.client.logout()
+        response, queries = self.follow_queries(reverse('posts:index'))
+        self.assertEqual(queries, [])
+        self.assertNotContains(response, 'Подписаться')
+
+    def test_fragment_is_per_viewer(self):
+        """Кешированная лента не отдаёт кнопки одного зрителя другому."""
+        bob = User.objects.create_user(username='bob')
+        Post.objects.create(author=bob, text='Пост bob')
+        url = reverse('posts:index')
+        self.client.force_login(bob)
+        response = self.client.get(url)
+        self.assertContains(response, 'Подписаться', count=3)
+        self.assertNotContains(response, 'Отписаться')
+
+        self.client.logout()
+        self.assertNotContains(self.client.get(url), 'Подписаться')
+
+        # Та же пустая версия подписок, но свои посты без кнопки.
+        carol = User.objects.create_user(username='carol')
+        self.client.force_login(carol)
+        response = self.client.get(url)
+        self.assertContains(response, 'Подписаться', count=4)
+
+        self.client.force_login(bob)
+        self.assertContains(self.client.get(url), 'Подписаться', count=3)
@@ -10,6 +10,7 @@ from django.core.cache import cache
 
 from posts.forms import PostForm, CommentForm
 from ..models import Post, Group, Comment
+from .utils import run_on_commit
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -132,19 +133,22 @@ class PostCreateFormTests(TestCase):
 
     def test_cache_index_page(self):
         """Проверка работы кеша главной страницы."""
+        cache.clear()
         response = self.client.get(reverse('posts:index'))
-        data_before_delete_clean = response.content
-        count_1 = Post.objects.count()
-        Post.objects.all().delete()
+        data_before_update = response.content
+        # update() не шлёт сигналов: страница отдаётся из кеша
+        Post.objects.update(text='Текст без сигналов')
         response = self.client.get(reverse('posts:index'))
-        data_before_clean = response.content
-        cache.clear()
+        self.assertEqual(data_before_update, response.content)
+        count_1 = Post.objects.count()
+        with run_on_commit():
+            Post.objects.all().delete()
         response = self.client.get(reverse('posts:index'))
-        data_after_delete_clean = response.content
+        data_after_delete = response.content
         count_2 = Post.objects.count()
-        self.assertEqual(data_before_delete_clean, data_before_clean)
         self.assertNotEqual(count_1, count_2)
-        self.assertNotEqual(data_before_delete_clean, data_after_delete_clean)
+        self.assertNotEqual(data_before_update, data_after_delete)
+        self.assertNotContains(response, 'Старый тест')
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image, features
+
+from .. import images
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Тег EXIF Orientation: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def make_image(size, image_format='JPEG', orientation=None):
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(
+        buffer, image_format, exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_DIMENSION=100, IMAGE_FORMAT=None
+)
+class OptimizeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def store(self, name, content):
+        return default_storage.save(name, ContentFile(content))
+
+    def test_downsample_and_strip_exif(self):
+        """Оригинал уменьшается, поворачивается по EXIF и теряет его."""
+        name = self.store(
+            'posts/photo.jpg', make_image((400, 200), orientation=6)
+        )
+        self.assertEqual(images.optimize(name), name)
+        with default_storage.open(name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.size, (50, 100))
+            self.assertNotIn('exif', image.info)
+            self.assertTrue(image.info.get('progressive'))
+
+    def test_processed_image_is_kept(self):
+        """Повторная обработка не пережимает файл."""
+        name = self.store('posts/again.jpg', make_image((400, 200)))
+        images.optimize(name)
+        with default_storage.open(name) as file:
+            content = file.read()
+        self.assertEqual(images.optimize(name), name)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_failed_write_keeps_original(self):
+        """Сбой записи не теряет оригинал загрузки."""
+        content = make_image((400, 200))
+        name = self.store('posts/broken.jpg', content)
+        with mock.patch.object(
+            default_storage, '_save', side_effect=OSError('disk full')
+        ):
+            with self.assertRaises(OSError):
+                images.optimize(name)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_replace_leaves_no_temporary_file(self):
+        name = self.store('posts/swap.jpg', make_image((400, 200)))
+        self.assertEqual(images.optimize(name), name)
+        _, files = default_storage.listdir('posts')
+        self.assertNotIn('swap.tmp.jpg', files)
+        with default_storage.open(name) as file:
+            self.assertEqual(Image.open(file).size, (100, 50))
+
+    @override_settings(IMAGE_FORMAT='WEBP')
+    def test_webp_renames_post_image(self):
+        """При перекодировании в WebP пост ссылается на новый файл."""
+        if not features.check('webp'):
+            self.skipTest('Pillow собран без WebP')
+        name = self.store('posts/photo.png', make_image((40, 40), 'PNG'))
+        post = Post.objects.create(author=self.user, text='Текст', image=name)
+        new_name = images.optimize(name)
+        self.assertTrue(new_name.endswith('.webp'))
+        self.assertFalse(default_storage.exists(name))
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, new_name)
+
+
+class UploadValidationTests(TestCase):
+    def form(self, content):
+        return PostForm(
+            data={'text': 'Текст'},
+            files={'image': SimpleUploadedFile(
+                'photo.jpg', content, content_type='image/jpeg'
+            )},
+        )
+
+    def test_valid_upload(self):
+        self.assertTrue(self.form(make_image((20, 10))).is_valid())
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_file_too_large(self):
+        """Слишком большой файл отклоняется формой."""
+        form = self.form(make_image((20, 10)))
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        """Размер в пикселях проверяется по заголовку изображения."""
+        form = self.form(make_image((20, 10)))
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
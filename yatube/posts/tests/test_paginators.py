@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import CursorPaginator, CursorPage
+
+User = get_user_model()
+
+page_count = settings.PER_PAGE_COUNT
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        for i in range(page_count * 2 + 3):
+            Post.objects.create(author=cls.user, text=f'Текст поста {i}')
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def test_pages_walk_forward_and_back(self):
+        """Курсоры ведут по ленте вперёд и назад без пропусков."""
+        paginator = CursorPaginator(Post.objects.all(), page_count)
+        first = paginator.get_cursor_page()
+        self.assertFalse(first.has_previous())
+        second = paginator.get_cursor_page(after=first.next_cursor)
+        third = paginator.get_cursor_page(after=second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(
+            list(first) + list(second) + list(third),
+            self.ordered
+        )
+        back = paginator.get_cursor_page(before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(
+            list(paginator.get_cursor_page(before=back.previous_cursor)),
+            list(first)
+        )
+
+    def test_no_count_query(self):
+        """Курсорная страница не делает COUNT(*) и OFFSET."""
+        paginator = CursorPaginator(Post.objects.all(), page_count)
+        token = paginator.get_cursor_page().next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.get_cursor_page(after=token)
+            list(page)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_broken_cursor_gives_first_page(self):
+        """Битый токен открывает первую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), page_count)
+        page = paginator.get_cursor_page(after='не-токен')
+        self.assertEqual(list(page), self.ordered[:page_count])
+
+    def test_feed_views_accept_cursor(self):
+        """Ленты переключаются на курсорную пагинацию по ?after=."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url + '?after=')
+                page_obj = response.context['page_obj']
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), page_count)
+                self.assertContains(
+                    response, f'?after={page_obj.next_cursor}'
+                )
@@ -0,0 +1,104 @@
+import re
+from unittest import SkipTest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный перебор таблицы (без индекса) или сортировка во временной таблице.
+BAD_PLAN = re.compile(r'^SCAN (TABLE )?\S+$|TEMP B-TREE')
+# Подсчёт строк для номеров страниц перебирает индекс по определению.
+SKIPPED = re.compile(r'^SELECT COUNT\(\*\)|^SAVEPOINT|^RELEASE|^INSERT')
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент идут по индексам без полного перебора и сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'sqlite':
+            raise SkipTest('Планы проверяются только для SQLite')
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            sql = query['sql']
+            if SKIPPED.match(sql) or 'posts_' not in sql:
+                continue
+            for step in self.explain(sql):
+                with self.subTest(url=url, sql=sql):
+                    self.assertIsNone(BAD_PLAN.search(step), step)
+
+    def test_feeds(self):
+        """Страницы лент, обычные и курсорные, читаются по индексам."""
+        cursor = {'after': ''}
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:posts_name', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:popular'),
+        ):
+            self.assertIndexedQueries(url)
+            self.assertIndexedQueries(url, cursor)
+
+    def test_cursor_seek(self):
+        """Курсор ищет страницу по индексу, а не перебирает его."""
+        response = self.client.get(reverse('posts:index'), {'after': ''})
+        page = response.context['page_obj']
+        paginator = page.paginator
+        values = paginator._parse(paginator._cursor_for(self.post))
+        queryset = paginator.object_list.filter(
+            paginator._seek(values, forward=True)
+        )
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('SEARCH posts_post USING INDEX post_pub_date_idx', plan)
+
+    def test_post_detail_and_comments(self):
+        """Комментарии поста выбираются по индексу (post, created)."""
+        self.assertIndexedQueries(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertIndexedQueries(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_follower_lookup(self):
+        """Подписчиков автора ищет индекс (author, user)."""
+        followers = Follow.objects.filter(author=self.author).values('user')
+        plan = ' '.join(self.explain(str(followers.query)))
+        self.assertIn('follow_author_user_idx', plan)
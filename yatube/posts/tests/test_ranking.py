@@ -0,0 +1,99 @@
+import math
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import ranking
+from ..models import Comment, Group, GroupRanking, Post, PostRanking
+
+User = get_user_model()
+
+
+class ScoreTests(SimpleTestCase):
+    def test_combine(self):
+        """Сумма вкладов считается в логарифмах."""
+        self.assertAlmostEqual(ranking.combine(0, 0), math.log(2))
+        self.assertEqual(ranking.combine(None, 1.5), 1.5)
+        # Большие значения не переполняют exp.
+        self.assertAlmostEqual(ranking.combine(1e6, 1e6), 1e6 + math.log(2))
+
+    @override_settings(RANKING_HALF_LIFE=3600)
+    def test_half_life(self):
+        """Событие на период полураспада старше весит вдвое меньше."""
+        now = timezone.now()
+        self.assertAlmostEqual(
+            ranking.event_score(1, now)
+            - ranking.event_score(1, now - timedelta(hours=1)),
+            math.log(2),
+        )
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet_group = Group.objects.create(
+            title='Тихая', slug='quiet', description='Описание'
+        )
+        cls.busy_group = Group.objects.create(
+            title='Шумная', slug='busy', description='Описание'
+        )
+        cls.quiet = Post.objects.create(
+            author=cls.author, group=cls.quiet_group, text='Тихий пост'
+        )
+        cls.busy = Post.objects.create(
+            author=cls.author, group=cls.busy_group, text='Обсуждаемый'
+        )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.busy, author=cls.reader, text=f'Ответ {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def scores(self):
+        return (
+            dict(PostRanking.objects.values_list('post', 'score')),
+            dict(GroupRanking.objects.values_list('group', 'score')),
+        )
+
+    def test_comments_raise_post_and_group(self):
+        """Комментарии поднимают пост и его группу в рейтинге."""
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.busy, self.quiet]
+        )
+        self.assertContains(response, 'Группы в тренде')
+        self.assertEqual(
+            ranking.trending_groups(2), [self.busy_group, self.quiet_group]
+        )
+
+    def test_rebuild_matches_incremental(self):
+        """Пересчёт с нуля даёт те же значения, что и сигналы."""
+        incremental = self.scores()
+        ranking.rebuild()
+        rebuilt = self.scores()
+        for before, after in zip(incremental, rebuilt):
+            self.assertEqual(before.keys(), after.keys())
+            for key, value in before.items():
+                self.assertAlmostEqual(after[key], value)
+
+    @override_settings(RANKING_WINDOW=60)
+    def test_rebuild_drops_old_posts(self):
+        """Посты старше RANKING_WINDOW выпадают из рейтинга."""
+        ranking.rebuild(now=timezone.now() + timedelta(minutes=5))
+        self.assertFalse(PostRanking.objects.exists())
+        self.assertFalse(GroupRanking.objects.exists())
+
+    def test_popular_query_count(self):
+        """Страница — COUNT(*) и один запрос по индексу, плюс блок групп."""
+        with self.assertNumQueries(3):
+            self.client.get(reverse('posts:popular'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('posts:popular'))
@@ -0,0 +1,118 @@
+from unittest import SkipTest
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+
+class StemTests(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова приводятся к одной основе."""
+        for words in (
+            ('книга', 'книги', 'книгами', 'книге'),
+            ('красивая', 'красивые', 'красивейший'),
+            ('ёлка', 'елки'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(word) for word in words}), 1)
+
+    def test_non_russian_words_kept(self):
+        """Латиница и числа не меняются, кроме регистра."""
+        self.assertEqual(search.tokenize('Django 2022'), ['django', '2022'])
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        search.rebuild()
+        self.cats = Post.objects.create(
+            author=self.user, text='Кошки любят спать. Кошка спит весь день.'
+        )
+        self.dogs = Post.objects.create(
+            author=self.user, text='Собаки и кошки гуляют вместе.'
+        )
+        self.birds = Post.objects.create(
+            author=self.user, text='Птицы поют по утрам.'
+        )
+
+    def find(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'])
+
+    def test_finds_word_forms_by_rank(self):
+        """Находятся все формы слова, релевантные посты выше."""
+        self.assertEqual(self.find('кошкам'), [self.cats, self.dogs])
+        self.assertEqual(self.find('собаки кошка'), [self.dogs])
+        self.assertEqual(self.find('слон'), [])
+        self.assertEqual(self.find(''), [])
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.birds.text = 'Кошки поют по утрам.'
+        self.birds.save()
+        self.assertIn(self.birds, self.find('кошки'))
+        self.cats.delete()
+        found = [post.pk for post in self.find('кошки')]
+        self.assertNotIn(self.cats.pk, found)
+        self.assertEqual(self.find('птицы'), [])
+
+    @override_settings(PER_PAGE_COUNT=2)
+    def test_cursor_pagination(self):
+        """Курсор проходит всю выдачу вперёд и назад без повторов."""
+        for i in range(3):
+            Post.objects.create(author=self.user, text=f'Кошка номер {i}')
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'кошка'})
+        seen = list(response.context['page_obj'])
+        while response.context['page_obj'].has_next():
+            response = self.client.get(url, {
+                'q': 'кошка',
+                'after': response.context['page_obj'].next_cursor,
+            })
+            seen.extend(response.context['page_obj'])
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        page = response.context['page_obj']
+        response = self.client.get(
+            url, {'q': 'кошка', 'before': page.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), seen[2:4])
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;')
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке фильтрует посты по индексу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs]
+        )
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5SearchTests(SearchMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not search.fts5_available():
+            raise SkipTest('SQLite собран без FTS5')
+        super().setUpClass()
+
+
+@override_settings(SEARCH_BACKEND='index')
+class InvertedIndexSearchTests(SearchMixin, TestCase):
+    pass
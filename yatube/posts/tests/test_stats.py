@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст поста')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        Post.objects.create(author=self.author, text='Второй пост')
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = self.stats(self.author)
+        self.assertEqual(stats.posts, 2)
+        self.assertEqual(stats.comments_received, 1)
+        self.assertEqual(stats.followers, 1)
+        self.assertEqual(self.stats(self.reader).following, 1)
+
+        comment.delete()
+        follow.delete()
+        self.post.delete()
+        stats = self.stats(self.author)
+        self.assertEqual(stats.posts, 1)
+        self.assertEqual(stats.comments_received, 0)
+        self.assertEqual(stats.followers, 0)
+        self.assertEqual(self.stats(self.reader).following, 0)
+
+    def test_profile_uses_counter(self):
+        """Профиль берёт число постов из AuthorStats без COUNT(*)."""
+        AuthorStats.objects.filter(author=self.author).update(posts=7)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        self.assertEqual(response.context['post_count'], 7)
+        self.assertEqual(response.context['page_obj'].paginator.count, 7)
+
+    def test_repair_command_fixes_drift(self):
+        """Команда repair_author_stats исправляет расхождения."""
+        AuthorStats.objects.filter(author=self.author).update(posts=42)
+        AuthorStats.objects.filter(author=self.reader).delete()
+        out = StringIO()
+        call_command('repair_author_stats', stdout=out)
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.assertEqual(self.stats(self.reader).posts, 0)
+        self.assertIn('исправлено: 2', out.getvalue())
@@ -0,0 +1,49 @@
+from django.db.models import Count
+from django.test import TestCase
+
+from .. import synthetic
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+
+class SyntheticDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.scale = synthetic.generate(
+            users=40, groups=3, posts=400, comments=300, seed=1
+        )
+
+    def test_counts(self):
+        """Создаётся ровно столько объектов, сколько запрошено."""
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(self.scale['posts'], 400)
+        self.assertEqual(self.scale['groups'], 3)
+        self.assertEqual(Follow.objects.count(), self.scale['follows'])
+
+    def test_power_law(self):
+        """Несколько авторов пишут большую часть постов."""
+        counts = sorted(
+            Post.objects.order_by().values('author').annotate(
+                total=Count('pk')
+            ).values_list('total', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(sum(counts[:4]), sum(counts) / 2)
+
+    def test_derived_data(self):
+        """Счётчики авторов и ленты подписчиков пересобраны."""
+        follow = Follow.objects.first()
+        stats = AuthorStats.objects.get(author_id=follow.author_id)
+        self.assertEqual(
+            stats.posts,
+            Post.objects.filter(author_id=follow.author_id).count(),
+        )
+        self.assertEqual(
+            stats.followers,
+            Follow.objects.filter(author_id=follow.author_id).count(),
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            ).count(),
+            Post.objects.filter(author_id=follow.author_id).count(),
+        )
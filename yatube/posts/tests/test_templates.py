@@ -0,0 +1,159 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import cards, follows
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст поста'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_feeds_share_post_card(self):
+        """Все ленты рисуют посты одной карточкой."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:posts_name', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=текст',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                # Иначе карточки придут из кеша, а не из шаблона.
+                cache.clear()
+                response = self.client.get(url)
+                self.assertTemplateUsed(
+                    response, 'posts/includes/post_card.html'
+                )
+                self.assertContains(response, 'Текст поста')
+                self.assertContains(response, 'все записи группы')
+
+    def test_card_options(self):
+        """В профиле нет строки автора, в подписках — кнопки."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertNotContains(response, 'Автор: Лев Толстой')
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Автор: Лев Толстой')
+        self.assertNotContains(response, 'Отписаться')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отписаться', count=1)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def render_cards(self, user):
+        template = Template(
+            '{% load post_cards %}{% post_cards posts as cards %}'
+            '{% for card in cards %}{{ card }}|{% endfor %}'
+        )
+        posts = Post.objects.for_feed().filter(
+            pk__in=[post.pk for post in self.posts]
+        )
+        return template.render(Context({
+            'posts': posts,
+            'user': user,
+            'followed_authors': follows.load(user.pk),
+        }))
+
+    def test_page_is_one_get_many(self):
+        """Страница читает карточки одним get_many, промахи рисуются."""
+        with mock.patch.object(cards, 'cache', wraps=cache) as card_cache:
+            first = self.render_cards(self.reader)
+            second = self.render_cards(self.reader)
+        self.assertEqual(card_cache.get_many.call_count, 2)
+        self.assertEqual(card_cache.set_many.call_count, 1)
+        self.assertEqual(first, second)
+        keys = [cards.cache_key(post, True) for post in self.posts]
+        self.assertEqual(len(cache.get_many(keys)), 3)
+
+    def test_key_follows_content(self):
+        """Правка поста, смена группы и имени автора меняют ключ."""
+        post = Post.objects.for_feed().get(pk=self.posts[0].pk)
+        keys = {cards.cache_key(post, True)}
+        post.text = 'Новый текст'
+        keys.add(cards.cache_key(post, True))
+        post.group = self.group
+        keys.add(cards.cache_key(post, True))
+        post.author.first_name = 'Лев'
+        keys.add(cards.cache_key(post, True))
+        self.assertEqual(len(keys), 4)
+        self.assertNotEqual(
+            cards.cache_key(post, True), cards.cache_key(post, False)
+        )
+
+    def test_edit_shows_up(self):
+        self.render_cards(self.reader)
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Исправлено')
+        self.assertIn('Исправлено', self.render_cards(self.reader))
+
+    def test_follow_button_is_per_viewer(self):
+        """Кнопка подписки не попадает в кешированную карточку."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.render_cards(self.reader).count('Отписаться'), 3
+        )
+        stranger = User.objects.create_user(username='stranger')
+        html = self.render_cards(stranger)
+        self.assertNotIn('Отписаться', html)
+        self.assertEqual(html.count('Подписаться'), 3)
+        self.assertNotIn(cards.FOLLOW_SLOT, html)
+
+
+class WarmTemplatesCommandTests(TestCase):
+    def test_report(self):
+        """Команда компилирует все шаблоны и замеряет отрисовку."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Текст')
+        out = StringIO()
+        call_command(
+            'warm_templates', 'posts/index.html', 'posts/post_detail.html',
+            iterations=2, json=True, stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['errors'], {})
+        self.assertGreater(report['compiled'], 30)
+        for name in ('posts/index.html', 'posts/post_detail.html'):
+            with self.subTest(name=name):
+                self.assertEqual(report['templates'][name]['count'], 2)
@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, ThumbnailTask
+from .utils import run_on_commit
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_SYNC=True)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def test_render_does_not_generate(self):
+        """Лента не создаёт миниатюру сама, а ставит задачу в очередь."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        self.assertIsNone(
+            thumbnails.cached_thumbnail(self.post.image, 'feed')
+        )
+        self.assertTrue(
+            ThumbnailTask.objects.filter(image=self.post.image.name).exists()
+        )
+
+    def test_task_generates_all_geometries(self):
+        """Задача готовит миниатюры всех размеров и уходит из очереди."""
+        thumbnails.enqueue(self.post.image.name)
+        self.assertTrue(thumbnails.run_task(self.post.image.name))
+        for alias in settings.THUMBNAIL_GEOMETRIES:
+            with self.subTest(alias=alias):
+                self.assertIsNotNone(
+                    thumbnails.cached_thumbnail(self.post.image, alias)
+                )
+        self.assertFalse(ThumbnailTask.objects.exists())
+        thumbnail = thumbnails.cached_thumbnail(self.post.image, 'feed')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_broken_image_is_retried_limited_times(self):
+        """Битое изображение не считается обработанным."""
+        thumbnails.enqueue('posts/missing.jpg')
+        self.assertFalse(thumbnails.run_task('posts/missing.jpg'))
+        task = ThumbnailTask.objects.get(image='posts/missing.jpg')
+        self.assertEqual(task.attempts, 1)
+
+    def test_resolve_many_uses_single_query(self):
+        """Миниатюры страницы ищутся одним запросом к хранилищу sorl."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост {i}',
+                image=SimpleUploadedFile(
+                    name=f'small{i}.gif', content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.run_task(post.image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            resolved = thumbnails.resolve_many(
+                [post.image for post in posts], 'feed'
+            )
+        self.assertEqual(len(resolved), len(posts))
+        self.assertNotIn(None, resolved.values())
+        with self.assertNumQueries(0):
+            thumbnails.resolve_many([post.image for post in posts], 'feed')
+
+    def test_feed_posts_carry_thumbnail(self):
+        """Посты ленты приходят в шаблон с готовой миниатюрой."""
+        thumbnails.run_task(self.post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        thumbnail = thumbnails.cached_thumbnail(self.post.image, 'feed')
+        self.assertEqual(post.thumb['url'], thumbnail.url)
+        self.assertEqual(post.thumb['width'], thumbnail.width)
+
+
+@override_settings(THUMBNAIL_SYNC=False)
+class SubmitTests(TestCase):
+    def test_default_runs_in_background(self):
+        """По умолчанию задача уходит в пул, а не в поток запроса."""
+        self.assertGreaterEqual(settings.THUMBNAIL_WORKERS, 1)
+        executor = mock.Mock()
+        with mock.patch.object(thumbnails, 'run_task') as run_task:
+            with mock.patch.object(
+                thumbnails, '_get_executor', return_value=executor
+            ):
+                thumbnails._submit('posts/background.jpg')
+        run_task.assert_not_called()
+        executor.submit.assert_called_once_with(
+            thumbnails._run_in_thread, 'posts/background.jpg'
+        )
+        thumbnails._in_flight.discard('posts/background.jpg')
+
+    def test_known_tasks_are_not_inserted_again(self):
+        """Повторный показ читает очередь и не пишет в неё."""
+        ThumbnailTask.objects.create(image='posts/queued.jpg')
+        ThumbnailTask.objects.create(
+            image='posts/broken.jpg',
+            attempts=settings.THUMBNAIL_MAX_ATTEMPTS,
+        )
+        names = ['posts/queued.jpg', 'posts/broken.jpg', 'posts/new.jpg']
+        with mock.patch.object(thumbnails, '_submit') as submit:
+            with run_on_commit():
+                thumbnails.enqueue_many(names)
+            with CaptureQueriesContext(connection) as queries:
+                with run_on_commit():
+                    thumbnails.enqueue_many(names[:2])
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries], ['SELECT']
+        )
+        self.assertEqual(
+            [call[0][0] for call in submit.call_args_list], [
+                'posts/new.jpg', 'posts/queued.jpg', 'posts/queued.jpg',
+            ]
+        )
+        self.assertEqual(ThumbnailTask.objects.count(), 3)
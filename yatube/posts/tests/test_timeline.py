@@ -0,0 +1,147 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        for i in range(3):
+            Post.objects.create(author=cls.author, text=f'Старый пост {i}')
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка заполняет ленту последними постами автора."""
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 3
+        )
+        self.assertEqual(
+            self.follow_page(),
+            list(Post.objects.filter(author=self.author))
+        )
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков при сохранении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.follow_page()[0], post)
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.follow_page(), [])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_capped(self):
+        """В ленте хранится не больше TIMELINE_LENGTH записей."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.other)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+
+    @override_settings(TIMELINE_LENGTH=5, TIMELINE_BATCH_SIZE=1)
+    def test_update_timelines_keeps_cap(self):
+        """Раскладка не подрезает ленты, это делает команда по расписанию."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            posts = [
+                Post.objects.create(author=self.author, text=f'Пост {i}')
+                for i in range(8)
+            ]
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('DELETE')
+        ])
+        # Три старых поста пришли с подпиской, восемь — раскладкой.
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.other).count(), 11
+        )
+        out = StringIO()
+        call_command('update_timelines', stdout=out)
+        self.assertIn('пользователей 2', out.getvalue())
+        for user in (self.user, self.other):
+            with self.subTest(user=user):
+                entries = TimelineEntry.objects.filter(user=user)
+                self.assertEqual(
+                    set(entries.values_list('post_id', flat=True)),
+                    {post.pk for post in posts[-5:]},
+                )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_read_on_demand(self):
+        """Посты популярных авторов подмешиваются при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(
+            self.follow_page(),
+            list(Post.objects.filter(author=self.author))
+        )
+        self.assertEqual(self.follow_page()[0], post)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_back_under_limit(self):
+        """Посты, пропущенные раскладкой, не пропадают из лент."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        # Третий подписчик: подписка уже без старых постов в ленте.
+        late = User.objects.create_user(username='late')
+        Follow.objects.create(user=late, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост на паузе')
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertFalse(TimelineEntry.objects.filter(user=late))
+        Follow.objects.filter(user=self.other).delete()
+        # Подписчиков снова не больше лимита, но пауза ещё стоит.
+        self.assertIn(post, timeline.follow_feed(late))
+        self.assertIn(post, timeline.follow_feed(self.user))
+
+        out = StringIO()
+        call_command('update_timelines', stdout=out)
+        self.assertIn('авторов 1', out.getvalue())
+        self.assertFalse(
+            AuthorStats.objects.get(author=self.author).fanout_paused
+        )
+        for user in (self.user, late):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    list(timeline.follow_feed(user)),
+                    list(Post.objects.filter(author=self.author)),
+                )
+                self.assertTrue(
+                    TimelineEntry.objects.filter(user=user, post=post)
+                )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.other))
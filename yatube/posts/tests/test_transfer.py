@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search
+from ..models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Кошки спят весь день'
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+        self.post.refresh_from_db()
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def clear(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка и загрузка NDJSON сохраняют данные и даты."""
+        call_command(
+            'export_data', output=self.path('dump.ndjson'), stdout=StringIO()
+        )
+        self.clear()
+        call_command(
+            'import_data', self.path('dump.ndjson'), batch_size=1,
+            stdout=StringIO(),
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        reader = User.objects.get(username='reader')
+        self.assertTrue(Follow.objects.filter(user=reader).exists())
+        # Производные данные пересобраны без сигналов.
+        self.assertEqual(AuthorStats.objects.get(author=post.author).posts, 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=reader).exists())
+        self.assertEqual(
+            search.filter_posts(Post.objects, 'кошка').get(), post
+        )
+
+    def test_stdout_is_ndjson(self):
+        """Без --output строки пишутся в stdout по одной на объект."""
+        out = StringIO()
+        call_command('export_data', models=['follow'], stdout=out)
+        self.assertEqual(
+            [json.loads(line) for line in out.getvalue().splitlines()],
+            [{'model': 'follow', 'user': 'reader', 'author': 'author'}],
+        )
+
+    def test_csv_round_trip(self):
+        """CSV выгружает и загружает одну модель."""
+        for model in ('group', 'post'):
+            call_command(
+                'export_data', models=[model], format='csv',
+                output=self.path(f'{model}.csv'), stdout=StringIO(),
+            )
+        self.clear()
+        for model in ('group', 'post'):
+            call_command(
+                'import_data', self.path(f'{model}.csv'), model=model,
+                stdout=StringIO(),
+            )
+        post = Post.objects.get()
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.image, '')
+
+    def test_bad_rows(self):
+        """Ошибки в файле сообщают номер строки."""
+        with open(self.path('bad.ndjson'), 'w') as file:
+            file.write('{"model": "post", "author": "author"}\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 1: Нет полей: id'):
+            call_command('import_data', self.path('bad.ndjson'))
+
+    def test_target_with_posts_is_refused(self):
+        """Посты с id из файла не загружаются поверх существующих."""
+        call_command(
+            'export_data', output=self.path('dump.ndjson'), stdout=StringIO()
+        )
+        with self.assertRaisesMessage(CommandError, 'только в пустую базу'):
+            call_command('import_data', self.path('dump.ndjson'))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_error_midway_rebuilds_written_batches(self):
+        """После ошибки записанные пачки получают счётчики и индекс."""
+        call_command(
+            'export_data', output=self.path('dump.ndjson'), stdout=StringIO()
+        )
+        with open(self.path('dump.ndjson'), 'a') as file:
+            file.write('{"model": "unknown"}\n')
+        self.clear()
+        with self.assertRaisesMessage(CommandError, 'Неизвестная модель'):
+            call_command(
+                'import_data', self.path('dump.ndjson'), batch_size=1,
+                stdout=StringIO(),
+            )
+        post = Post.objects.get()
+        self.assertEqual(AuthorStats.objects.get(author=post.author).posts, 1)
+        self.assertEqual(
+            search.filter_posts(Post.objects, 'кошка').get(), post
+        )
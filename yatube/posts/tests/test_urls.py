@@ -1,9 +1,12 @@
 from http import HTTPStatus
 
-from django.test import TestCase, Client
+from django.test import SimpleTestCase, TestCase, Client
 from django.contrib.auth import get_user_model
+from django.urls import reverse, set_script_prefix
 
+from .. import links
 from ..models import Group, Post
+from ..urls import urlpatterns
 
 User = get_user_model()
 
@@ -33,6 +36,7 @@ class PostUrlTests(TestCase):
             'posts/group_list.html': f'/group/{PostUrlTests.group.slug}/',
             'posts/profile.html': f'/profile/{self.user}/',
             'posts/post_detail.html': f'/posts/{int(PostUrlTests.post.id)}/',
+            'posts/popular.html': '/popular/',
         }
 
         for template, address in templates_url_names.items():
@@ -69,9 +73,44 @@ class PostUrlTests(TestCase):
             f'/posts/{int(PostUrlTests.post.id)}/': 'posts/post_detail.html',
             '/create/': 'posts/create_post.html',
             f'/posts/{int(PostUrlTests.post.id)}/edit/': pc_temp,
+            '/popular/': 'posts/popular.html',
         }
 
         for address, template in templates_url_names.items():
             with self.subTest(address=address):
                 response = self.authorized_client.get(address)
                 self.assertTemplateUsed(response, template)
+
+
+class LinksTests(SimpleTestCase):
+    VALUES = {
+        'post_id': [1, 42, 10 ** 9],
+        'slug': ['leo-hater', 'group_1'],
+        'username': ['auth', 'лев.толстой', 'a+b@c', '100'],
+    }
+
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def assert_same_as_reverse(self):
+        for pattern in urlpatterns:
+            names = list(pattern.pattern.converters)
+            values = [self.VALUES[name] for name in names] or [[None]]
+            for value in values[0]:
+                kwargs = dict.fromkeys(names, value)
+                with self.subTest(name=pattern.name, kwargs=kwargs):
+                    self.assertEqual(
+                        links.url(pattern.name, **kwargs),
+                        reverse(f'posts:{pattern.name}', kwargs=kwargs),
+                    )
+
+    def test_same_as_reverse(self):
+        """Собранные адреса совпадают с reverse() для всех маршрутов."""
+        self.assert_same_as_reverse()
+
+    def test_script_prefix(self):
+        """Префикс скрипта подставляется при сборке, а не при компиляции."""
+        links.url('index')
+        set_script_prefix('/yatube/')
+        self.assertEqual(links.url('index'), '/yatube/')
+        self.assert_same_as_reverse()
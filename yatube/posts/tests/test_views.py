@@ -9,9 +9,11 @@ from django import forms
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
 
 from posts.forms import PostForm
-from ..models import Group, Post, Follow
+from ..models import Comment, Group, Post, Follow
+from .utils import run_on_commit
 
 User = get_user_model()
 
@@ -472,3 +474,164 @@ class PostPagesPaginatorTests(TestCase):
                         self.post15.image
                     )
                 k += 1
+
+
+class FeedQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget',
+            description='Тестовое описание',
+        )
+        for i in range(page_count):
+            author = User.objects.create_user(
+                username=f'author{i}', first_name=f'Имя{i}'
+            )
+            Post.objects.create(
+                author=author, group=cls.group, text=f'Текст поста {i}'
+            )
+            Follow.objects.create(user=cls.user, author=author)
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        # Группе и профилю нужен ещё id владельца для ETag.
+        budgets = {
+            reverse('posts:index'): 2,
+            reverse(
+                'posts:posts_name', kwargs={'slug': self.group.slug}
+            ): 4,
+            reverse(
+                'posts:profile', kwargs={'username': self.author}
+            ): 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+        # сессия и пользователь + подписки, COUNT(*) и страница
+        with self.assertNumQueries(5):
+            self.authorized_client.get(reverse('posts:follow_index'))
+
+    def test_for_feed_comment_count(self):
+        """for_feed(comment_count=True) добавляет число комментариев."""
+        post = Post.objects.filter(author=self.author).get()
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        posts = {p.pk: p for p in Post.objects.for_feed(comment_count=True)}
+        self.assertEqual(posts[post.pk].comment_count, 1)
+        self.assertEqual(len({p.comment_count for p in posts.values()}), 2)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста')
+        for i in range(5):
+            commenter = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}'
+            )
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста только первая порция комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        # ETag: автор поста и сводка комментариев, затем сама страница.
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2']
+        )
+        self.assertContains(response, comments.next_cursor)
+
+    def test_comments_fragment_endpoint(self):
+        """Следующие комментарии отдаются фрагментом и в JSON."""
+        url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.id}
+        )
+        first = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(first['comments']), 3)
+        second = self.client.get(
+            url, {'format': 'json', 'after': first['next']}
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in second['comments']],
+            ['Комментарий 3', 'Комментарий 4']
+        )
+        self.assertIsNone(second['next'])
+        response = self.client.get(url, {'after': first['next']})
+        self.assertContains(response, 'Комментарий 4')
+        self.assertNotContains(response, 'Комментарий 2')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменившаяся страница отдаётся как 304 без отрисовки."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:posts_name', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('Cookie', response['Vary'])
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_etag_follows_changes(self):
+        """Метка меняется с данными страницы и с пользователем."""
+        index = reverse('posts:index')
+        etag = self.client.get(index)['ETag']
+        self.assertNotEqual(self.reader_client.get(index)['ETag'], etag)
+        with run_on_commit():
+            Post.objects.create(author=self.author, text='Новый пост')
+        self.assertNotEqual(self.client.get(index)['ETag'], etag)
+
+        profile = reverse('posts:profile', kwargs={'username': self.author})
+        etag = self.reader_client.get(profile)['ETag']
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertNotEqual(self.reader_client.get(profile)['ETag'], etag)
+
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(detail)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
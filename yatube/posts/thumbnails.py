@@ -0,0 +1,233 @@
+"""Фоновая подготовка миниатюр для изображений постов.
+
+Очередь хранится в таблице ThumbnailTask, поэтому задачи переживают
+перезапуск процесса; пул потоков разбирает её после коммита записи.
+Перед нарезкой миниатюр оригинал проходит posts.images.optimize.
+Ленты получают готовые миниатюры всей страницы через
+``attach_thumbnails`` одним обращением к хранилищу sorl и никогда
+не ждут обработки изображения.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import caching, images
+from .models import Post, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Изображения, которые этот процесс уже обрабатывает.
+_in_flight = set()
+
+
+def thumbnail_options(source, alias):
+    """Геометрия и полный набор параметров, как их дополнит sorl."""
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[alias]
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return geometry, options
+
+
+def thumbnail_file(image, alias):
+    """Файл миниатюры, который sorl создал бы для ``image``."""
+    source = ImageFile(image)
+    geometry, options = thumbnail_options(source, alias)
+    name = default.backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnail(image, alias):
+    """Готовая миниатюра из хранилища sorl или None, без генерации."""
+    return default.kvstore.get(thumbnail_file(image, alias))
+
+
+def _raw_values(keys):
+    """Сырые значения хранилища sorl для ключей за один проход."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        rows = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # Как и sorl, запоминаем в кеше и отсутствие записи.
+        fetched = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def resolve_many(images, alias):
+    """Готовые миниатюры для набора изображений одним запросом.
+
+    Возвращает словарь «имя изображения -> ImageFile или None».
+    """
+    files = {
+        image.name: thumbnail_file(image, alias) for image in images if image
+    }
+    keys = {add_prefix(file.key): name for name, file in files.items()}
+    values = _raw_values(list(keys))
+    return {
+        keys[key]: deserialize_image_file(value) if value else None
+        for key, value in values.items()
+    }
+
+
+def attach_thumbnails(posts, alias='feed'):
+    """Добавляет постам ``thumb`` с url, width и height миниатюры.
+
+    Отсутствующие миниатюры ставятся в очередь, ``thumb`` у таких
+    постов None.
+    """
+    posts = list(posts)
+    resolved = resolve_many((post.image for post in posts), alias)
+    for post in posts:
+        thumbnail = resolved.get(post.image.name) if post.image else None
+        post.thumb = None
+        if thumbnail is not None:
+            post.thumb = {
+                'url': thumbnail.url,
+                'width': thumbnail.width,
+                'height': thumbnail.height,
+            }
+    enqueue_many(
+        name for name, thumbnail in resolved.items() if thumbnail is None
+    )
+    return posts
+
+
+def generate(name):
+    """Создаёт миниатюры всех размеров из THUMBNAIL_GEOMETRIES.
+
+    Возвращает False, если sorl не смог прочитать исходник: в этом
+    случае он молча отдаёт пустую миниатюру и ничего не сохраняет.
+    """
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES.values():
+        thumbnail = get_thumbnail(name, geometry, **options)
+        if not default.kvstore.get(thumbnail):
+            return False
+    return True
+
+
+def run_task(name):
+    current = name
+    try:
+        current = images.optimize(name)
+        done = generate(current)
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+        done = False
+    if not done:
+        ThumbnailTask.objects.filter(image=name).update(
+            attempts=F('attempts') + 1
+        )
+        return False
+    ThumbnailTask.objects.filter(image=name).delete()
+    # Закешированные ленты показывали оригинал — обновим их.
+    for post in Post.objects.filter(image=current).only('author', 'group'):
+        caching.bump(*caching.post_scopes(post))
+    return True
+
+
+def _run_in_thread(name):
+    try:
+        run_task(name)
+    finally:
+        with _executor_lock:
+            _in_flight.discard(name)
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(settings.THUMBNAIL_WORKERS, 1),
+                thread_name_prefix='thumbnails',
+            )
+            # Задачи, оставшиеся от прошлых запусков процесса.
+            for name in pending():
+                _in_flight.add(name)
+                _executor.submit(_run_in_thread, name)
+    return _executor
+
+
+def pending():
+    return list(ThumbnailTask.objects.filter(
+        attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS
+    ).values_list('image', flat=True))
+
+
+def _submit(name):
+    if settings.THUMBNAIL_SYNC:
+        run_task(name)
+        return
+    executor = _get_executor()
+    with _executor_lock:
+        if name in _in_flight:
+            return
+        _in_flight.add(name)
+    executor.submit(_run_in_thread, name)
+
+
+def enqueue(name):
+    """Ставит изображение в очередь; обработка начнётся после коммита."""
+    enqueue_many([name])
+
+
+def enqueue_many(names):
+    """Пакетный вариант ``enqueue``.
+
+    Ленты вызывают его на каждый показ, поэтому сначала одно чтение:
+    изображения с задачей в очереди только передаются пулу, исчерпавшие
+    попытки пропускаются, а вставка — транзакция записи — нужна лишь
+    для новых.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+    attempts = dict(ThumbnailTask.objects.filter(
+        image__in=names
+    ).values_list('image', 'attempts'))
+    new = names - set(attempts)
+    if new:
+        ThumbnailTask.objects.bulk_create(
+            [ThumbnailTask(image=name) for name in sorted(new)],
+            ignore_conflicts=True,
+        )
+    ready = new | {
+        name for name, count in attempts.items()
+        if count < settings.THUMBNAIL_MAX_ATTEMPTS
+    }
+    for name in sorted(ready):
+        transaction.on_commit(lambda name=name: _submit(name))
@@ -0,0 +1,257 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+TIMELINE_ORDERING = ('-feed_date', '-feed_id')
+
+
+def celebrity_ids(author_ids):
+    """Авторы, чьи посты подмешиваются в ленты при чтении.
+
+    Кроме авторов с подписчиками сверх TIMELINE_FANOUT_LIMIT, сюда
+    входят авторы на паузе: их подписчиков уже меньше, но посты за
+    время паузы update_timelines ещё не разложил.
+    """
+    return set(
+        AuthorStats.objects.filter(
+            Q(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+            | Q(fanout_paused=True),
+            author_id__in=author_ids,
+        ).values_list('author_id', flat=True)
+    )
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids([author_id])
+
+
+def pause(author_id):
+    """Отмечает, что посты автора пропущены раскладкой."""
+    AuthorStats.objects.filter(
+        author_id=author_id, fanout_paused=False
+    ).update(fanout_paused=True)
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        pause(post.author_id)
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers
+    )
+    # Лишние записи подрезает update_timelines вне транзакции записи.
+
+
+def trim_many(user_ids):
+    """Оставляет в лентах только TIMELINE_LENGTH последних записей.
+
+    Один DELETE на пачку из TIMELINE_BATCH_SIZE пользователей: номера
+    записей в каждой ленте считает оконная функция по индексу
+    (user, -pub_date, -id).
+    """
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    user_ids = list(user_ids)
+    size = settings.TIMELINE_BATCH_SIZE
+    for start in range(0, len(user_ids), size):
+        batch = user_ids[start:start + size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY user_id ORDER BY pub_date DESC, id DESC'
+                f') AS position FROM {table} '
+                f'WHERE user_id IN ({placeholders})) AS ranked '
+                f'WHERE position > %s)',
+                [*batch, settings.TIMELINE_LENGTH],
+            )
+
+
+def trim(user_id):
+    trim_many([user_id])
+
+
+def overflowing():
+    """Пользователи, в лентах которых больше TIMELINE_LENGTH записей."""
+    return list(
+        TimelineEntry.objects.order_by().values('user_id').annotate(
+            entries=Count('id')
+        ).filter(
+            entries__gt=settings.TIMELINE_LENGTH
+        ).values_list('user_id', flat=True)
+    )
+
+
+def trim_overflowing():
+    """Подрезает переполненные ленты, возвращает число пользователей.
+
+    Каждая пачка удаляется своей короткой транзакцией, поэтому задача
+    не держит блокировку записи дольше одного DELETE.
+    """
+    user_ids = overflowing()
+    trim_many(user_ids)
+    return len(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_celebrity(author_id):
+        pause(author_id)
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_LENGTH]
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    )
+    trim(user_id)
+
+
+def _fill(author_id, user_ids, posts):
+    """Пишет посты автора в ленты пользователей пачками.
+
+    Каждая пачка — отдельная транзакция не больше TIMELINE_BATCH_SIZE
+    записей.
+    """
+    if not posts:
+        return
+    user_ids = list(user_ids)
+    size = max(settings.TIMELINE_BATCH_SIZE // len(posts), 1)
+    for start in range(0, len(user_ids), size):
+        _bulk_insert(
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id in user_ids[start:start + size]
+            for post_id, pub_date in posts
+        )
+
+
+def resume(author_id):
+    """Снимает паузу раскладки, дописав посты автора в ленты.
+
+    Пока пауза стоит, посты автора подмешиваются при чтении, поэтому
+    ленты заполняются короткими транзакциями. Последняя транзакция
+    догоняет подписки, отписки и посты, появившиеся за это время, и
+    снимает паузу. Возвращает False, если подписчиков снова больше
+    TIMELINE_FANOUT_LIMIT.
+    """
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    filled_posts = list(posts[:settings.TIMELINE_LENGTH])
+    filled_users = set(followers)
+    _fill(author_id, filled_users, filled_posts)
+    with transaction.atomic():
+        if AuthorStats.objects.filter(
+            author_id=author_id,
+            followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).exists():
+            return False
+        latest = list(posts[:settings.TIMELINE_LENGTH])
+        current = set(followers)
+        _fill(author_id, current - filled_users, latest)
+        _fill(author_id, current & filled_users, [
+            post for post in latest if post not in filled_posts
+        ])
+        TimelineEntry.objects.filter(author_id=author_id).exclude(
+            user_id__in=followers
+        ).delete()
+        AuthorStats.objects.filter(author_id=author_id).update(
+            fanout_paused=False
+        )
+    return True
+
+
+def resume_paused():
+    """Снимает паузу со всех авторов, которые вернулись под лимит."""
+    author_ids = AuthorStats.objects.filter(
+        fanout_paused=True,
+        followers__lte=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+    return sum(resume(author_id) for author_id in list(author_ids))
+
+
+def rebuild(user_id):
+    """Собирает ленту заново, например после загрузки данных без сигналов."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    followed = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+    posts = Post.objects.filter(author_id__in=followed).exclude(
+        author_id__in=celebrity_ids(followed)
+    ).values_list('pk', 'author_id', 'pub_date')[:settings.TIMELINE_LENGTH]
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in posts
+    )
+
+
+def remove(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user):
+    """Лента избранных авторов.
+
+    Обычные авторы читаются из материализованной ленты пользователя,
+    посты «знаменитостей» подмешиваются при чтении.
+    """
+    followed = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    celebrities = celebrity_ids(followed)
+    if not celebrities:
+        # Сортируем по полям самой ленты: их покрывает индекс
+        # (user, -pub_date, -id), и сортировка во временной таблице
+        # не нужна.
+        posts = Post.objects.for_feed().filter(
+            timeline_entries__user=user
+        ).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_id=F('timeline_entries__id'),
+        )
+    else:
+        entries = TimelineEntry.objects.filter(user=user).values('post_id')
+        posts = Post.objects.for_feed().filter(
+            Q(pk__in=entries) | Q(author_id__in=celebrities)
+        ).annotate(feed_date=F('pub_date'), feed_id=F('id'))
+    return posts.order_by(*TIMELINE_ORDERING)
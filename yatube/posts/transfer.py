@@ -0,0 +1,324 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Формат — NDJSON (по объекту на строку, с полем ``model``) или CSV (одна
+модель на файл). Авторы и группы передаются по username и slug, посты
+и комментарии — со своими id, чтобы на них можно было сослаться.
+Поэтому посты и комментарии загружаются только в базу, где их ещё нет;
+пользователи и группы сопоставляются с существующими.
+Изображения передаются путями относительно MEDIA_ROOT.
+
+Загрузка пишет через bulk_create пачками, каждая пачка — в своей
+транзакции. Сигналы post_save при этом не срабатывают, поэтому
+счётчики авторов, ленты подписчиков, рейтинги, поисковый индекс и
+версии кеша обновляются отдельно: индекс — по пачкам, остальное —
+в ``finish``, в том числе после ошибки на середине файла.
+"""
+import csv
+import io
+import json
+import os
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import (caching, follows, ranking, search, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post, User
+
+# Порядок важен: каждая модель ссылается только на предыдущие.
+FIELDS = {
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comment': ('id', 'post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+MODELS = tuple(FIELDS)
+# Модели, которые загружаются со своими id.
+KEEP_IDS = {'post': Post, 'comment': Comment}
+REQUIRED = {
+    'group': ('slug',),
+    'post': ('id', 'author'),
+    'comment': ('id', 'post', 'author'),
+    'follow': ('user', 'author'),
+}
+EXPORT_QUERIES = {
+    'group': lambda: Group.objects.values_list(
+        'slug', 'title', 'description'
+    ),
+    'post': lambda: Post.objects.values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    ),
+    'comment': lambda: Comment.objects.values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    ),
+    'follow': lambda: Follow.objects.values_list(
+        'user__username', 'author__username'
+    ),
+}
+
+
+def export_rows(model, chunk_size):
+    """Строки модели словарями; память не растёт с размером таблицы."""
+    fields = FIELDS[model]
+    queryset = EXPORT_QUERIES[model]().order_by('pk')
+    for values in queryset.iterator(chunk_size=chunk_size):
+        row = dict(zip(fields, values))
+        for name, value in row.items():
+            if hasattr(value, 'isoformat'):
+                row[name] = value.isoformat()
+        yield row
+
+
+def write_ndjson(stream, models, chunk_size):
+    total = 0
+    for model in MODELS:
+        if model not in models:
+            continue
+        for row in export_rows(model, chunk_size):
+            stream.write(
+                json.dumps({'model': model, **row}, ensure_ascii=False)
+                + '\n'
+            )
+            total += 1
+    return total
+
+
+def write_csv(stream, model, chunk_size):
+    writer = csv.DictWriter(stream, FIELDS[model], lineterminator='\n')
+    writer.writeheader()
+    total = 0
+    for row in export_rows(model, chunk_size):
+        writer.writerow(row)
+        total += 1
+    return total
+
+
+def read_ndjson(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'Строка {number}: {error}')
+        yield number, row.pop('model', None), row
+
+
+def read_csv(stream, model):
+    # Первая строка — заголовок, данные начинаются со второй.
+    for number, row in enumerate(csv.DictReader(stream), 2):
+        yield number, model, {
+            name: value if value != '' else None
+            for name, value in row.items()
+        }
+
+
+@contextmanager
+def keep_dates():
+    """Не подменять даты из файла текущим временем (auto_now_add)."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value!r}')
+    return date
+
+
+class Importer:
+    """Копит строки по моделям и записывает их пачками."""
+
+    def __init__(self, batch_size=1000, media_dir=None):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.pending = defaultdict(list)
+        self.counts = Counter()
+        self.users = {}
+        self.groups = {}
+        self.authors = set()
+        self.followers = set()
+        self.images = []
+        self.checked = set()
+
+    def add(self, model, row):
+        if model not in FIELDS:
+            raise ValueError(f'Неизвестная модель: {model!r}')
+        missing = [name for name in REQUIRED[model] if not row.get(name)]
+        if missing:
+            raise ValueError(f'Нет полей: {", ".join(missing)}')
+        self.check_empty(model)
+        # Строки, на которые ссылается эта, должны быть уже записаны.
+        for previous in MODELS[:MODELS.index(model)]:
+            self.flush(previous)
+        self.pending[model].append(row)
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        rows = self.pending.pop(model, None)
+        if not rows:
+            return
+        with transaction.atomic(), keep_dates():
+            getattr(self, f'_write_{model}')(rows)
+        self.counts[model] += len(rows)
+
+    def check_empty(self, model):
+        """Id из файла не должны совпасть с уже записанными строками.
+
+        Проверка идёт до первой пачки модели, чтобы загрузка не
+        оборвалась на середине с частью записанных пачек.
+        """
+        if model not in KEEP_IDS or model in self.checked:
+            return
+        if KEEP_IDS[model].objects.exists():
+            raise ValueError(
+                f'В базе уже есть строки {model}: посты и комментарии '
+                f'загружаются только в пустую базу'
+            )
+        self.checked.add(model)
+
+    def flush_all(self):
+        for model in MODELS:
+            self.flush(model)
+
+    def finish(self):
+        """Пересобирает производные данные для записанных пачек.
+
+        Вызывается и после ошибки: пачки до неё уже в базе.
+        """
+        if not self.counts:
+            return self.counts
+        call_command('repair_author_stats', stdout=io.StringIO())
+        self.followers.update(
+            Follow.objects.filter(author_id__in=self.authors).values_list(
+                'user_id', flat=True
+            )
+        )
+        for user_id in self.followers:
+            timeline.rebuild(user_id)
+        follows.invalidate(*self.followers)
+        ranking.rebuild()
+        thumbnails.enqueue_many(self.images)
+        caching.bump(caching.GLOBAL_SCOPE)
+        return self.counts
+
+    def user_ids(self, usernames):
+        missing = set(usernames) - set(self.users)
+        if missing:
+            self.users.update(
+                User.objects.filter(username__in=missing).values_list(
+                    'username', 'pk'
+                )
+            )
+            new = missing - set(self.users)
+            if new:
+                User.objects.bulk_create(
+                    User(username=name, password=make_password(None))
+                    for name in new
+                )
+                self.users.update(
+                    User.objects.filter(username__in=new).values_list(
+                        'username', 'pk'
+                    )
+                )
+        return self.users
+
+    def group_ids(self, slugs):
+        missing = set(slugs) - set(self.groups) - {None}
+        if missing:
+            self.groups.update(
+                Group.objects.filter(slug__in=missing).values_list(
+                    'slug', 'pk'
+                )
+            )
+        unknown = missing - set(self.groups)
+        if unknown:
+            raise ValueError(f'Нет групп: {", ".join(sorted(unknown))}')
+        return self.groups
+
+    def copy_image(self, name):
+        source = os.path.join(self.media_dir, name)
+        if default_storage.exists(name) or not os.path.exists(source):
+            return
+        with open(source, 'rb') as file:
+            default_storage.save(name, File(file))
+
+    def _write_group(self, rows):
+        Group.objects.bulk_create(
+            (
+                Group(
+                    slug=row['slug'],
+                    title=row.get('title') or row['slug'],
+                    description=row.get('description') or '',
+                )
+                for row in rows
+            ),
+            ignore_conflicts=True,
+        )
+
+    def _write_post(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        groups = self.group_ids(row.get('group') for row in rows)
+        posts = []
+        for row in rows:
+            image = row.get('image') or ''
+            if image:
+                if self.media_dir:
+                    self.copy_image(image)
+                self.images.append(image)
+            posts.append(Post(
+                id=int(row['id']),
+                author_id=users[row['author']],
+                group_id=groups.get(row.get('group')),
+                text=row.get('text') or '',
+                pub_date=_date(row.get('pub_date')),
+                image=image,
+            ))
+        Post.objects.bulk_create(posts)
+        self.authors.update(post.author_id for post in posts)
+        search.index_many((post.pk, post.text) for post in posts)
+
+    def _write_comment(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        Comment.objects.bulk_create(
+            Comment(
+                id=int(row['id']),
+                post_id=int(row['post']),
+                author_id=users[row['author']],
+                text=row.get('text') or '',
+                created=_date(row.get('created')),
+            )
+            for row in rows
+        )
+
+    def _write_follow(self, rows):
+        users = self.user_ids(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        follows = [
+            Follow(user_id=users[row['user']], author_id=users[row['author']])
+            for row in rows
+            if row['user'] != row['author']
+        ]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.followers.update(follow.user_id for follow in follows)
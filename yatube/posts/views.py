@@ -1,66 +1,116 @@
 from django.shortcuts import render, redirect
 from django.shortcuts import get_object_or_404
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.conf import settings
+from django.utils.http import urlencode
 
-from .models import Post, Group, User, Follow
-from .forms import PostForm, CommentForm
+from core.db_router import use_primary
 
-page_count = settings.PER_PAGE_COUNT
+from .models import Post, Group, User, Follow, Comment
+from .forms import PostForm, CommentForm
+from .caching import cached_page
+from .etags import (conditional, group_etag, index_etag, post_etag,
+                    profile_etag)
+from .paginators import CursorPaginator, paginate
+from .ranking import popular_posts
+from .search import SearchPaginator
+from .stats import get_stats
+from .timeline import follow_feed
+from . import follows, thumbnails
 
 
+@conditional(index_etag)
 def index(request):
-    posts = Post.objects.select_related('group').all()
-    paginator = Paginator(posts, page_count)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.for_feed()
+    page_obj, feed_version = cached_page(
+        request, 'index', posts, prepare=thumbnails.attach_thumbnails
+    )
     context = {
         'page_obj': page_obj,
+        'feed_version': feed_version,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.post_set.all()
-    paginator = Paginator(posts, page_count)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.post_set.for_feed()
+    page_obj, feed_version = cached_page(
+        request, f'group:{group.pk}', posts,
+        prepare=thumbnails.attach_thumbnails,
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_version': feed_version,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional(profile_etag)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    post_count = posts.count()
-    paginator = Paginator(posts, page_count)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following: bool = False
-    if request.user.is_authenticated and request.user != author:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    posts = author.posts.for_feed()
+    post_count = get_stats(author).posts
+    page_obj, feed_version = cached_page(
+        request, f'author:{author.pk}', posts, count=post_count,
+        prepare=thumbnails.attach_thumbnails,
+    )
+    following = author.pk in follows.for_request(request)
     context = {
         'page_obj': page_obj,
         'post_count': post_count,
         'author': author,
         'following': following,
+        'feed_version': feed_version,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(post_id, after=None):
+    """Очередная порция комментариев поста по курсору ``created``."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'id'),
+    )
+    return paginator.get_cursor_page(after=after)
+
+
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = comments_page(post.pk, request.GET.get('after'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@conditional(post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    post_count = get_stats(post.author).posts
     comment_form = CommentForm()
-    comments = post.comments.all()
+    comments = comments_page(post.pk, request.GET.get('comments_after'))
     context = {
         'post': post,
         'post_count': post_count,
@@ -70,7 +120,9 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@use_primary
 @login_required
+@transaction.atomic
 def post_create(request):
 
     if request.method == 'POST':
@@ -83,6 +135,8 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if post.image:
+                thumbnails.enqueue(post.image.name)
             return redirect('posts:profile', username=request.user)
 
         return render(request, 'posts/create_post.html', {'form': form})
@@ -95,6 +149,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@use_primary
 @login_required
 def post_edit(request, post_id):
     is_edit = True
@@ -111,6 +166,8 @@ def post_edit(request, post_id):
         )
         if form.is_valid():
             post = form.save()
+            if 'image' in form.changed_data and post.image:
+                thumbnails.enqueue(post.image.name)
             return redirect('posts:post_detail', post_id=post_id)
 
         context = {
@@ -132,7 +189,9 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+@use_primary
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -144,23 +203,46 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, settings.PER_PAGE_COUNT)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    thumbnails.attach_thumbnails(page_obj.object_list)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'cursor_params': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def popular(request):
+    """Посты с наибольшим рейтингом из таблицы PostRanking."""
+    page_obj = paginate(request, popular_posts())
+    thumbnails.attach_thumbnails(page_obj.object_list)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__in=Follow.objects.filter(
-            user=request.user
-        ).values_list('author_id')
-    )
-    paginator = Paginator(posts, page_count)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = follow_feed(request.user)
+    page_obj = paginate(request, posts)
+    thumbnails.attach_thumbnails(page_obj.object_list)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@use_primary
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
@@ -169,7 +251,9 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@use_primary
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
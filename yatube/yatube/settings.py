@@ -52,6 +52,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,18 +71,38 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Производственный режим: разобранные шаблоны живут в памяти процесса
+# и не перечитываются с диска. Включён без DEBUG; YATUBE_TEMPLATE_CACHE=1
+# или 0 задаёт режим явно. Прогрев при старте — команда warm_templates.
+TEMPLATE_CACHE = os.environ.get(
+    'YATUBE_TEMPLATE_CACHE', '0' if DEBUG else '1'
+) == '1'
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Загрузчики заданы явно, шаблоны приложений (и панели отладки) находит
+# app_directories.Loader, поэтому проверка на APP_DIRS не нужна.
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.feed_cache.feed_cache',
+                'core.context_processors.follows.follows',
             ],
         },
     },
@@ -94,11 +116,43 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Реплики только для чтения: YATUBE_REPLICAS=/path/a.sqlite3,/path/b.sqlite3.
+# Локально это копии основной БД, их обновляет команда sync_replicas.
+DATABASE_REPLICAS = []
+for _number, _path in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{_number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': _path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_number}')
+
+# Применяются к каждому соединению SQLite (core.sqlite). WAL позволяет
+# читать во время записи, busy_timeout — ждать блокировку, а не падать.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+# Транзакции берут блокировку на запись сразу (core.backends.sqlite3).
+SQLITE_BEGIN = 'IMMEDIATE'
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной БД.
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'pin_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -139,6 +193,18 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'yatube', 'static'),)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Без DEBUG collectstatic пишет имена с хешем содержимого и сжатые копии
+# (.gz, .br при установленном brotli), а yatube.wsgi отдаёт их сам через
+# core.staticfiles; YATUBE_SERVE_STATIC=1 или 0 задаёт это явно.
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    )
+STATIC_SERVE = os.environ.get(
+    'YATUBE_SERVE_STATIC', '0' if DEBUG else '1'
+) == '1'
+# Кеширование файлов без хеша в имени; файлы с хешем — навсегда.
+STATIC_MAX_AGE = 60 * 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'group:index'
@@ -151,17 +217,139 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Constants
 
 PER_PAGE_COUNT = 10
+COMMENTS_PER_PAGE = 50
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Файлы из MEDIA_ROOT отдаёт core.media.serve. 'x-accel-redirect' (nginx)
+# или 'x-sendfile' (Apache, lighttpd) передают отправку фронтенду; для
+# nginx MEDIA_ACCEL_PREFIX — internal location с alias на MEDIA_ROOT.
+MEDIA_SENDFILE = os.environ.get('YATUBE_MEDIA_SENDFILE') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 60 * 60 * 24
 
 # Caches
 
-CACHES = {
-    'default': {
+# LocMemCache у каждого процесса свой, поэтому без DEBUG по умолчанию
+# используется общий SQLiteCache (core.cache_backends); YATUBE_CACHE
+# задаёт бэкенд явно.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE', 'locmem' if DEBUG else 'sqlite')
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+# Сброс кеша после записи виден другим процессам только через общий
+# бэкенд. С LocMemCache версии, страницы и подписки живут недолго, чтобы
+# остальные воркеры отставали не больше чем на эти секунды.
+CACHE_IS_SHARED = CACHE_BACKEND != 'locmem'
+LOCAL_CACHE_TIMEOUT = 20
+
+# Timeline
+
+# Сколько последних постов хранится в ленте подписчика. Раскладка
+# нового поста ленты не подрезает: это делает update_timelines по
+# расписанию.
+TIMELINE_LENGTH = 1000
+# Посты авторов с большим числом подписчиков не раскладываются по лентам,
+# а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BATCH_SIZE = 500
+
+# Время жизни закешированных страниц лент; актуальность обеспечивают
+# версии в posts.caching, которые сдвигаются при каждой записи. Сами
+# версии в общем кеше не истекают.
+FEED_CACHE_TIMEOUT = (
+    60 * 60 * 6 if CACHE_IS_SHARED else LOCAL_CACHE_TIMEOUT
+)
+FEED_VERSION_TIMEOUT = None if CACHE_IS_SHARED else LOCAL_CACHE_TIMEOUT
+# Отрисованные карточки постов (posts.cards). Ключ меняется вместе с
+# содержимым карточки, поэтому время жизни ограничивает только объём.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Thumbnails
+
+# Размеры миниатюр, которые используют шаблоны: псевдоним -> (геометрия,
+# параметры sorl). Все они готовятся в фоне сразу после загрузки.
+THUMBNAIL_GEOMETRIES = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x339', {'crop': 'center'}),
+}
+# Размер пула фоновых потоков; запрос никогда не ждёт обработки
+# изображения, в том числе в разработке.
+THUMBNAIL_WORKERS = 2
+# Только для тестов: генерировать сразу после коммита в потоке запроса.
+THUMBNAIL_SYNC = False
+THUMBNAIL_MAX_ATTEMPTS = 3
+
+# Images
+
+# Загрузки всегда пишутся во временный файл, а не держатся в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+# Оригиналы уменьшаются до этого размера по большей стороне.
+IMAGE_MAX_DIMENSION = 2048
+# None — сохранять в исходном формате, 'WEBP' — перекодировать в WebP,
+# если Pillow собран с его поддержкой.
+IMAGE_FORMAT = None
+IMAGE_QUALITY = 85
+
+# Сколько хранится в кеше множество подписок пользователя; сигналы
+# подписки сбрасывают его сразу.
+FOLLOW_SET_CACHE_TIMEOUT = (
+    60 * 60 if CACHE_IS_SHARED else LOCAL_CACHE_TIMEOUT
+)
+
+# Rankings
+
+# За это время вклад поста или комментария в рейтинг падает вдвое.
+RANKING_HALF_LIFE = 60 * 60 * 12
+# update_rankings пересчитывает рейтинги постов не старше этого.
+RANKING_WINDOW = 60 * 60 * 24 * 7
+RANKING_COMMENT_WEIGHT = 1
+# Добавка к весу публикации на log(1 + число подписчиков автора).
+RANKING_FOLLOWER_WEIGHT = 0.5
+TRENDING_GROUPS_COUNT = 5
+TRENDING_GROUPS_CACHE_TIMEOUT = 60
+
+# Search
+
+# 'fts5' — виртуальная таблица SQLite FTS5, 'index' — инвертированный
+# индекс в таблице SearchTerm для любой БД, 'auto' — FTS5, если есть.
+SEARCH_BACKEND = 'auto'
+SEARCH_BATCH_SIZE = 500
+
+# Query budgets
+
+# Предельное число SQL-запросов на запрос к view, включая сессию и
+# пользователя. Превышение пишется в лог или, с 'raise', даёт ошибку.
+QUERY_BUDGETS = {
+    'posts:index': 8,
+    'posts:posts_name': 8,
+    'posts:profile': 9,
+    'posts:post_detail': 9,
+    'posts:follow_index': 9,
+    'posts:search': 8,
+    'posts:popular': 8,
 }
+QUERY_BUDGET_ACTION = 'log'
+# Сколько последних запросов каждого view учитывается в отчёте.
+REQUEST_REPORT_SIZE = 1000
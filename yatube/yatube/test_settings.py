@@ -0,0 +1,8 @@
+"""Настройки для pytest.
+
+Тесты с ``transaction=True`` действительно коммитят, и фоновые потоки
+миниатюр делили бы с тестом базу SQLite в памяти.
+"""
+from .settings import *  # noqa: F401,F403
+
+THUMBNAIL_SYNC = True
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.STATIC_SERVE:
+    from core.staticfiles import StaticFilesApplication
+
+    application = StaticFilesApplication(application)
+
+# Шаблоны компилируются при загрузке воркера, а не первыми запросами.
+if settings.TEMPLATE_CACHE:
+    from core import warmup
+
+    warmup.warm()